@@ -1,12 +1,17 @@
+import time
+
+import numpy as np
 import streamlit as st
 import pandas as pd
 
-from src.fetch_llama import get_yield_data
-from src.enrich_metrics import add_basic_columns, add_trend_columns_and_snapshot
-from src.risk_flags import apply_risk_flags
-from src.formatting import format_for_display
-from src import config
-from src.fetch_gas import get_eth_gas_gwei
+from src.view import IL_CHOICES, SORT_OPTIONS, build_leaderboard, filter_mask, sort_positions
+from src.change_feed import latest_changes
+from src import config, data_service
+from src import refresh
+from src.pipeline import OUTPUT_COLS
+from src.resilience import breaker_statuses
+from src.search import SearchIndex
+from src.scoring import SCORE_FEATURES, build_feature_matrix, composite_scores, top_k_positions
 
 
 # -------------------------
@@ -21,56 +26,61 @@ st.set_page_config(
 st.title("DeFi Liquidity Pool Screener")
 st.caption("Not financial advice. Yield != safety. High APY often means high risk or short-term incentives.")
 
-# Show live gas so you understand why Net Yield After Gas moves
-gas_now = get_eth_gas_gwei()
-if gas_now is not None:
-    st.write(f"📊 Current Ethereum gas: {gas_now:.1f} gwei")
-else:
-    st.write("📊 Current Ethereum gas: (unavailable)")
+# Filled in at the bottom of the script while a background refresh runs
+refresh_status = st.empty()
 
 # -------------------------
-# LOAD + ENRICH DATA
+# LOAD DATA (last published table first, refresh in the background)
 # -------------------------
 
-# 1. Fetch raw data
-df_raw = get_yield_data()
+def describe_age(seconds):
+    if seconds is None:
+        return "unknown age"
+    if seconds < 90:
+        return "just now"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min ago"
+    return f"{seconds / 3600:.1f} h ago"
+
+
+# One table per published version for the whole process (src/data_service.py):
+# every session reads it by reference, nobody fetches or enriches per session.
+manifest, df_scored = data_service.current()
+data_service.refresh_if_stale(manifest)
+
+if manifest is None:
+    # Nothing published yet (first ever run): nothing to show until the first refresh lands.
+    with st.spinner("Loading pools from DeFiLlama for the first time…"):
+        while refresh.is_refreshing():
+            time.sleep(0.25)
+    manifest, df_scored = data_service.current()
+
+data_age = data_service.data_age_seconds(manifest)
+
+if manifest is not None:
+    # Built once per version and shared too. Moving a weight slider only
+    # re-runs the matrix-vector product below, typing a search only queries the index.
+    score_features = data_service.artifact(manifest, "score_features", build_feature_matrix)
+    search_index = data_service.artifact(manifest, "search_index", SearchIndex)
+    gas_now = manifest.get("gas_gwei")
+else:
+    df_scored = pd.DataFrame(columns=OUTPUT_COLS)
+    score_features = build_feature_matrix(df_scored)
+    search_index = SearchIndex(df_scored)
+    gas_now = None
 
-if df_raw is None or df_raw.empty:
+# Show gas so you understand why Net Yield After Gas moves
+if gas_now is not None:
+    st.write(f"📊 Ethereum gas: {gas_now:.1f} gwei ({describe_age(data_age)})")
+else:
+    st.write("📊 Ethereum gas: (unavailable)")
+
+if df_scored.empty:
     st.warning("⚠️ No data loaded from DeFiLlama (API may be rate-limited or temporarily unavailable). Showing empty table.")
 else:
-    st.success(f"✅ Loaded {len(df_raw)} pools from DeFiLlama.")
-
-# 2. Derive metrics (total_apy, il_risk, gas_context, etc.)
-df_enriched = add_basic_columns(df_raw)
-
-# 3. Add TVL trend and snapshot (best-effort, won't crash on failure)
-df_enriched = add_trend_columns_and_snapshot(df_enriched)
-
-# 4. Add audit_status + red_flag, and other safety logic
-df_scored = apply_risk_flags(df_enriched)
-
-# 5. Safety: ensure expected columns always exist so downstream code doesn't KeyError
-expected_cols = [
-    "chain",
-    "project",
-    "symbol",
-    "tvlUsd",
-    "fee_apy",
-    "reward_apy",
-    "total_apy",
-    "il_risk",
-    "audit_status",
-    "gas_context",
-    "net_yield_after_gas",
-    "tvl_trend_7d",
-    "red_flag",
-    "pool_name",
-    "volume_24h_usd",
-    "vol_to_tvl",
-]
-for col in expected_cols:
-    if col not in df_scored.columns:
-        df_scored[col] = None
+    st.success(f"✅ {len(df_scored)} pools from DeFiLlama, updated {describe_age(data_age)}.")
+
+delta = latest_changes()
 
 # -------------------------
 # SIDEBAR FILTERS
@@ -78,6 +88,14 @@ for col in expected_cols:
 
 st.sidebar.header("Filters")
 
+# Search (prefix + typo-tolerant, every word must match)
+search_query = st.sidebar.text_input(
+    "Search pools",
+    value="",
+    placeholder="e.g. weth usdc arbitrum",
+    help="Matches token symbols, protocol and chain by prefix; small typos are forgiven."
+)
+
 # Chain filter (robust even if data is missing)
 if "chain" in df_scored.columns and not df_scored["chain"].dropna().empty:
     all_chains = sorted(df_scored["chain"].dropna().unique().tolist())
@@ -103,20 +121,11 @@ min_tvl = st.sidebar.number_input(
 # IL risk tolerance
 il_filter_choice = st.sidebar.selectbox(
     "Max IL Risk allowed",
-    options=["Low only", "Low + Medium", "Show all"],
+    options=list(IL_CHOICES),
     index=1,
     help="Impermanent loss = if tokens move apart in price, you might bleed vs just holding them."
 )
 
-def il_allowed(il_value: str) -> bool:
-    if il_filter_choice == "Show all":
-        return True
-    if il_filter_choice == "Low + Medium":
-        return il_value in ["Low", "Medium"]
-    if il_filter_choice == "Low only":
-        return il_value == "Low"
-    return True
-
 # Hide obvious sketch
 hide_red_flag = st.sidebar.checkbox(
     "Hide ⚠ risky pools",
@@ -124,129 +133,115 @@ hide_red_flag = st.sidebar.checkbox(
     help="⚠ = tiny TVL on an expensive chain, unaudited + huge reward APY, recent exploit, etc."
 )
 
+# Only pools whose advertised APY actually held up (needs snapshot history)
+sustainable_only = st.sidebar.checkbox(
+    "Only sustainable yield",
+    value=False,
+    help="Keep pools that paid at least "
+         f"{config.SUSTAINABLE_MIN_PERSISTENCE_PCT:.0f}% of their advertised APY over the longest window we have "
+         "history for (7/30/90d) and aren't decaying fast. Pools without enough daily snapshots are hidden."
+)
+
 # Sort choice
 sort_choice = st.sidebar.selectbox(
     "Sort by",
-    options=[
-        "Net Yield After Gas (%)",
-        "TVL ($)",
-        "Fee APY (%)",
-        "Total APY (%)",
-    ],
+    options=list(SORT_OPTIONS),
     index=0,
     help="What matters most to you right now?"
 )
 
-# -------------------------
-# APPLY FILTER LOGIC
-# -------------------------
-
-df_filtered = df_scored.copy()
-
-# filter by chain
-if "chain" in df_filtered.columns and chains_selected:
-    df_filtered = df_filtered[df_filtered["chain"].isin(chains_selected)]
-
-# filter by min TVL
-if "tvlUsd" in df_filtered.columns:
-    df_filtered = df_filtered[df_filtered["tvlUsd"].fillna(0) >= float(min_tvl)]
-
-# filter by IL risk
-if "il_risk" in df_filtered.columns:
-    df_filtered = df_filtered[df_filtered["il_risk"].apply(il_allowed)]
-
-# filter by red flag (defensive: only if column exists)
-if hide_red_flag and "red_flag" in df_filtered.columns:
-    df_filtered = df_filtered[df_filtered["red_flag"].fillna("") == ""]
+# Composite score weights (used when sorting by "Composite score")
+with st.sidebar.expander("Composite score weights", expanded=SORT_OPTIONS[sort_choice] is None):
+    score_weights = {
+        key: st.slider(label, min_value=0, max_value=10, value=config.SCORE_WEIGHTS_DEFAULT[key], key=f"w_{key}")
+        for key, label in SCORE_FEATURES.items()
+    }
+    st.caption("Each feature is scaled 0-1 (higher = better); the score is the weighted average × 100.")
+
+# Upstream health: circuit breaker per source (see src/resilience.py)
+st.sidebar.markdown("---")
+st.sidebar.subheader("Data sources")
+state_icons = {"closed": "🟢", "half-open": "🟡", "open": "🔴"}
+breakers = breaker_statuses()
+if not breakers:
+    st.sidebar.caption("No upstream calls yet in this process.")
+for b in breakers:
+    line = f"{state_icons.get(b['state'], '⚪')} **{b['source']}** — {b['state']}"
+    if b["last_latency"] is not None:
+        line += f" · {b['last_latency']:.1f}s / {b['budget_seconds']}s budget"
+    if b["retry_in_seconds"] is not None:
+        line += f" · retry in {b['retry_in_seconds']:.0f}s"
+    st.sidebar.markdown(line)
+    if b["serving_cache_since"] is not None:
+        st.sidebar.caption(f"Serving last good {b['source']} payload. Last error: {b['last_error']}")
 
 # -------------------------
-# PREP COLUMNS FOR DISPLAY
+# APPLY FILTER LOGIC
 # -------------------------
 
-display_cols_raw = [
-    "pool_name",            # <symbol> | <project> | <chain>
-    "tvlUsd",               # TVL
-    "volume_24h_usd",       # 24h volume (Uniswap v3 pools only right now)
-    "vol_to_tvl",           # capital efficiency
-    "fee_apy",              # fee APY
-    "reward_apy",           # incentive APY
-    "total_apy",            # fee + reward
-    "il_risk",              # Low / Medium / High
-    "audit_status",         # includes exploit info where known
-    "gas_context",          # Cheap gas / High gas
-    "net_yield_after_gas",  # APY after gas penalty
-    "tvl_trend_7d",         # ▲ or ▼ once snapshot history accumulates
-    "red_flag",             # ⚠ marker
-]
-
-nice_names = {
-    "pool_name": "Pool",
-    "tvlUsd": "TVL ($)",
-    "volume_24h_usd": "Vol 24h ($)",
-    "vol_to_tvl": "Vol/TVL (24h)",
-    "fee_apy": "Fee APY (%)",
-    "reward_apy": "Reward APY (%)",
-    "total_apy": "Total APY (%)",
-    "il_risk": "IL Risk",
-    "audit_status": "Audit / Exploit Status",
-    "gas_context": "Gas Context",
-    "net_yield_after_gas": "Net Yield After Gas (%)",
-    "tvl_trend_7d": "TVL Trend (7d)",
-    "red_flag": "Red Flag",
-}
-
-# Only keep columns that actually exist in df_filtered
-existing_display_cols = [c for c in display_cols_raw if c in df_filtered.columns]
+# df_scored is the cached, shared table: never copy or modify it here.
+# Filters become one boolean mask over its rows.
+row_mask = filter_mask(
+    df_scored,
+    # nothing / everything selected = no chain filter (so newly listed chains show up)
+    chains=None if not chains_selected or set(chains_selected) == set(all_chains) else chains_selected,
+    min_tvl=min_tvl,
+    il_choice=il_filter_choice,
+    hide_red_flag=hide_red_flag,
+    sustainable_only=sustainable_only,
+)
+row_positions = np.flatnonzero(row_mask)
 
-# Build df_display with nice names
-df_display = df_filtered[existing_display_cols].rename(columns=nice_names)
+# Search hits are row positions too: intersect, no string scanning per rerun
+if search_query.strip():
+    row_positions = np.intersect1d(row_positions, search_index.search(search_query), assume_unique=True)
 
 # -------------------------
-# SORT ROWS
+# SORT ROWS + PREP FOR DISPLAY
 # -------------------------
 
-# Mapping from UI sort label -> pretty column name in df_display
-sort_map = {
-    "Net Yield After Gas (%)": "Net Yield After Gas (%)",
-    "TVL ($)": "TVL ($)",
-    "Fee APY (%)": "Fee APY (%)",
-    "Total APY (%)": "Total APY (%)",
-}
-
-sort_col_pretty = sort_map[sort_choice]  # e.g. "Net Yield After Gas (%)"
-
-df_display_for_sort = df_display.copy()
-
-# Create a numeric helper column for sorting
-if sort_col_pretty in df_display_for_sort.columns:
-    df_display_for_sort["_sort_helper"] = pd.to_numeric(
-        df_display_for_sort[sort_col_pretty].str.replace("%", "", regex=False)
-        if df_display_for_sort[sort_col_pretty].dtype == object
-        else df_display_for_sort[sort_col_pretty],
-        errors="coerce"
-    )
+sort_col = SORT_OPTIONS[sort_choice]
+if sort_col is None:
+    # Composite score: weights x precomputed features, then the top K only
+    scores = composite_scores(score_features, score_weights)
+    row_order = top_k_positions(scores, row_positions, config.SCORE_TOP_K)
 else:
-    # fallback if somehow missing
-    df_display_for_sort["_sort_helper"] = pd.Series(dtype=float)
+    scores = None
+    row_order = sort_positions(df_scored, row_positions, sort_col)
 
-df_display_for_sort = df_display_for_sort.sort_values(
-    "_sort_helper",
-    ascending=False,
-    na_position="last"
-).drop(columns=["_sort_helper"], errors="ignore")
+# Only the surviving rows/columns get copied, renamed and formatted
+df_display_pretty = build_leaderboard(df_scored, row_order, scores=scores)
 
 # -------------------------
-# HUMAN-FRIENDLY FORMATTING
+# RENDER TABLE + EXPLANATION
 # -------------------------
 
-df_display_pretty = format_for_display(df_display_for_sort)
+change_labels = {
+    "added": "New pool",
+    "removed": "Removed",
+    "apy_jump": "APY jump",
+    "tvl_jump": "TVL jump",
+    "new_red_flag": "New ⚠",
+}
 
-# Drop columns that are 100% empty/null after formatting
-df_display_pretty = df_display_pretty.dropna(axis=1, how="all")
-
-# -------------------------
-# RENDER TABLE + EXPLANATION
-# -------------------------
+# The change log only records refreshes where something moved, so this is
+# the latest set of changes, not necessarily the latest refresh: label it
+# with when it happened.
+with st.expander(f"What changed ({len(delta)})", expanded=False):
+    if delta.empty:
+        st.write("No changes recorded yet.")
+    else:
+        changes_at = delta["timestamp_utc"].iloc[0]
+        changes_age = (pd.Timestamp.now(tz="UTC") - pd.Timestamp(changes_at)).total_seconds()
+        st.caption(f"Last changes, recorded {describe_age(changes_age)} · {changes_at}")
+        counts = delta["change"].value_counts()
+        st.write(" · ".join(f"{change_labels[k]}: {counts[k]}" for k in change_labels if k in counts))
+        st.dataframe(
+            delta.assign(change=delta["change"].map(change_labels))[["change", "pool_name", "old", "new"]]
+                .rename(columns={"change": "Change", "pool_name": "Pool", "old": "Before", "new": "After"}),
+            width="stretch",
+            hide_index=True
+        )
 
 st.subheader("Leaderboard")
 
@@ -255,6 +250,11 @@ st.write(
     "Green-looking pools with no ⚠ and healthy TVL are usually safer starting points."
 )
 
+if search_query.strip():
+    st.caption(f"{len(row_positions)} pools match “{search_query.strip()}” with the current filters.")
+if scores is not None and len(row_positions) > len(row_order):
+    st.caption(f"Top {len(row_order)} of {len(row_positions)} matching pools by composite score.")
+
 st.dataframe(
     df_display_pretty,
     width="stretch",
@@ -283,6 +283,9 @@ st.markdown("""
 - **IL Risk**  
   Impermanent loss danger. High IL means if the tokens move apart in price, you might bleed vs just holding them.
 
+- **Exp. IL (%) / Tail IL (%)**  
+  Simulated impermanent loss over the next 30 days vs just holding the tokens: the average outcome, and the average of the worst 5% of outcomes. Compare it with a month of Fee APY.
+
 - **Audit / Exploit Status**  
   Rough safety snapshot. “Unknown” doesn’t mean scam, but it means slow down and actually read.
 
@@ -292,9 +295,29 @@ st.markdown("""
 - **Net Yield After Gas (%)**  
   Our rough “is this even worth it for a normal wallet” estimate, not just the pretty headline APY. This now adapts based on live Ethereum gas.
 
+- **Realized APY 30d (%) / APY Held Up 30d (%)**  
+  What the pool actually paid on average over the last 30 days of snapshots, and that as a % of what it advertised 30 days ago. Well under 100% = the headline APY didn't last. Needs ~2 weeks of daily snapshots to show up.
+
 - **TVL Trend (7d)**  
   Will show ▲ or ▼ once your snapshots have ~1 week of history. Up = money flowing in (confidence). Down = people leaving.
 
+- **Score**  
+  Composite score (0-100) when sorting by it: fee share of APY, Vol/TVL, TVL, TVL trend, IL risk and red flags, weighted by the sliders in the sidebar.
+
 - **Red Flag**  
   ⚠ means slow down: maybe tiny TVL on an expensive chain, maybe yield is 100% bribed, maybe audit is unknown or exploit history.
 """)
+
+# -------------------------
+# BACKGROUND REFRESH
+# -------------------------
+
+# The page above is already on screen. If a refresh is running, say so and
+# rerun once it has published, so the new table swaps in place.
+if refresh.is_refreshing():
+    while refresh.is_refreshing():
+        refresh_status.info(f"🔄 Refreshing data in the background… ({refresh.seconds_refreshing():.0f}s)")
+        time.sleep(0.5)
+    st.rerun()
+elif refresh.last_error:
+    refresh_status.warning(f"⚠️ Last refresh failed ({refresh.last_error}). Showing data from {describe_age(data_age)}.")
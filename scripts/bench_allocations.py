@@ -0,0 +1,96 @@
+# bench_allocations.py
+# How much memory does one Streamlit rerun (filter -> sort -> format the
+# leaderboard) and one pipeline run allocate, relative to the table itself?
+#
+#   python scripts/bench_allocations.py [--pools 20000]
+#
+# "legacy" replays what app.py used to do on every rerun (df_scored.copy(),
+# a chain of filtered copies, display copy, sort-helper copy, format copy);
+# "current" is src/view.py (one mask, one take of the surviving rows).
+# Peaks are measured with tracemalloc, which sees numpy and pandas buffers.
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from stub_upstream import make_pools  # noqa: E402
+
+from src.formatting import format_for_display  # noqa: E402
+from src.pipeline import enrich_serial  # noqa: E402
+from src.view import DISPLAY_COLS, NICE_NAMES, build_leaderboard, filter_mask, sort_positions  # noqa: E402
+
+FILTERS = dict(chains=["Ethereum", "Arbitrum", "Base", "Polygon", "Optimism"], min_tvl=250000,
+               il_choice="Show all", hide_red_flag=True)
+SORT_COL = "net_yield_after_gas"
+
+
+def legacy_view(df_scored):
+    df_filtered = df_scored.copy()
+    df_filtered = df_filtered[df_filtered["chain"].isin(FILTERS["chains"])]
+    df_filtered = df_filtered[df_filtered["tvlUsd"].fillna(0) >= float(FILTERS["min_tvl"])]
+    df_filtered = df_filtered[df_filtered["il_risk"].apply(lambda v: True)]
+    df_filtered = df_filtered[df_filtered["red_flag"].fillna("") == ""]
+    df_display = df_filtered[[c for c in DISPLAY_COLS if c in df_filtered.columns]].rename(columns=NICE_NAMES)
+    df_sort = df_display.copy()
+    df_sort["_sort_helper"] = pd.to_numeric(df_sort[NICE_NAMES[SORT_COL]], errors="coerce")
+    df_sort = df_sort.sort_values("_sort_helper", ascending=False, na_position="last").drop(columns=["_sort_helper"])
+    return format_for_display(df_sort.copy()).dropna(axis=1, how="all")
+
+
+def current_view(df_scored):
+    mask = filter_mask(df_scored, **FILTERS)
+    order = sort_positions(df_scored, np.flatnonzero(mask), SORT_COL)
+    return build_leaderboard(df_scored, order)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    out = fn(*args)
+    took = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, peak, took
+
+
+def mb(n):
+    return f"{n / 1e6:7.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pools", type=int, default=20000)
+    args = parser.parse_args()
+
+    df_raw = pd.DataFrame(make_pools(args.pools))
+    side = {"gas_gwei": 30.0, "df_uni": pd.DataFrame(), "audit_df": pd.DataFrame(), "trend_baseline": pd.DataFrame()}
+
+    df_scored, peak, took = measure(enrich_serial, df_raw, side, False)
+    table = df_scored.memory_usage(deep=True).sum()
+    print(f"pools: {args.pools}   scored table: {mb(table)}")
+    print(f"pipeline (enrich_serial)   peak {mb(peak)}  = {peak / table:4.2f}x table   {took * 1000:6.0f} ms")
+
+    old, old_peak, old_took = measure(legacy_view, df_scored)
+    new, new_peak, new_took = measure(current_view, df_scored)
+    print(f"rerun, legacy app.py       peak {mb(old_peak)}  = {old_peak / table:4.2f}x table   {old_took * 1000:6.0f} ms")
+    print(f"rerun, view.py             peak {mb(new_peak)}  = {new_peak / table:4.2f}x table   {new_took * 1000:6.0f} ms")
+
+    # legacy sorted with quicksort, so rows with equal keys may come out in a
+    # different order; compare the rows, not their order among ties
+    same = (old.sort_values(list(old.columns)).reset_index(drop=True)
+            .equals(new.sort_values(list(new.columns)).reset_index(drop=True)))
+    print(f"same rows: {same} ({len(new)} rows)")
+
+
+if __name__ == "__main__":
+    main()
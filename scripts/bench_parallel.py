@@ -0,0 +1,86 @@
+# bench_parallel.py
+# Does src/parallel.py give the same table as the serial pipeline, and how
+# does its throughput scale with workers? Exits non-zero if any worker count
+# gives a different table.
+#
+#   python scripts/bench_parallel.py [--pools 60000] [--workers 1,2,4,8] [--repeat 3]
+#
+# workers=1 is pipeline.enrich_serial; every other count is enrich_parallel
+# with that many processes (spawn start-up included, as in a real refresh).
+# Each timing is the best of --repeat runs, and the IL cache is cleared
+# before each one so the serial run doesn't get the simulations for free.
+# Scaling only means something with at least that many free cores; this
+# prints os.cpu_count() next to the numbers.
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import pandas as pd  # noqa: E402
+
+from stub_upstream import make_pools  # noqa: E402
+
+from src import il_sim  # noqa: E402
+from src.backtest import BACKTEST_COLS  # noqa: E402
+from src.parallel import enrich_parallel  # noqa: E402
+from src.pipeline import enrich_serial  # noqa: E402
+
+
+def run(df_raw, side, workers):
+    il_sim._cache.clear()
+    started = time.perf_counter()
+    if workers == 1:
+        out = enrich_serial(df_raw, side, save_snapshot=False)
+    else:
+        out = enrich_parallel(df_raw, side, workers=workers)
+    return out, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pools", type=int, default=60000)
+    parser.add_argument("--workers", default=",".join(str(w) for w in sorted({1, 2, 4, os.cpu_count() or 1})))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    worker_counts = [int(w) for w in args.workers.split(",")]
+
+    os.chdir(ROOT)  # il_sim reads data/fixtures relative to the repo
+    df_raw = pd.DataFrame(make_pools(args.pools))
+    side = {
+        "gas_gwei": 30.0,
+        "vol_table": il_sim.load_vol_table(),
+        "df_uni": pd.DataFrame(),
+        "audit_df": pd.DataFrame(),
+        "trend_baseline": pd.DataFrame(),
+        "apy_backtest": pd.DataFrame(columns=BACKTEST_COLS),
+    }
+    print(f"pools: {args.pools}   cpu_count: {os.cpu_count()}   best of {args.repeat}")
+
+    serial, _ = run(df_raw, side, 1)
+    serial_best = None
+    failed = False
+    for workers in worker_counts:
+        best = None
+        for _ in range(args.repeat):
+            out, took = run(df_raw, side, workers)
+            best = took if best is None else min(best, took)
+        if workers == 1:
+            serial_best = best
+        same = out.equals(serial)
+        failed |= not same
+        speedup = f"{serial_best / best:5.2f}x serial" if serial_best else ""
+        print(f"workers {workers:3d}   {best * 1000:8.0f} ms   {args.pools / best:10,.0f} rows/s   "
+              f"{speedup}   same as serial: {same}")
+
+    if failed:
+        print("FAIL parallel output differs from enrich_serial")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
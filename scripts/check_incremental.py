@@ -0,0 +1,101 @@
+# check_incremental.py
+# Check that incremental enrichment (src/incremental.py) gives the same table
+# as a full enrich() and only re-enriches what it has to. Exits non-zero on
+# the first failed check.
+#
+#   python scripts/check_incremental.py [--pools 2000]
+#
+# Runs in a throwaway working directory, like check_resilience.py, since
+# every run writes today's snapshot.
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import pandas as pd  # noqa: E402
+
+from stub_upstream import make_pools  # noqa: E402
+
+from src.il_sim import load_vol_table  # noqa: E402
+from src.incremental import IncrementalEnricher  # noqa: E402
+from src.pipeline import enrich  # noqa: E402
+
+
+def check(name, ok, detail=""):
+    print(f"{'ok  ' if ok else 'FAIL'} {name}{' — ' + detail if detail else ''}")
+    if not ok:
+        sys.exit(1)
+
+
+def uniswap_table(symbols):
+    return pd.DataFrame({
+        "symbol": symbols,
+        "volume_24h_usd": [250000.0 + i for i in range(len(symbols))],
+        "tvl_uniswap_usd": [1000000.0] * len(symbols),
+        "vol_to_tvl": [0.25] * len(symbols),
+        "feeTier": [0.3] * len(symbols),
+    })
+
+
+def same_as_full(inc, df_raw, side):
+    out = inc.run(df_raw, side)
+    full = enrich(df_raw, side, save_snapshot=False)
+    return out.reset_index(drop=True).equals(full.reset_index(drop=True))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pools", type=int, default=2000)
+    args = parser.parse_args()
+
+    fixtures = os.path.join(ROOT, "data", "fixtures")
+    os.chdir(tempfile.mkdtemp(prefix="lp-screener-incremental-"))
+    shutil.copytree(fixtures, os.path.join("data", "fixtures"))
+
+    df = pd.DataFrame(make_pools(args.pools))
+    n = len(df)
+    side = {
+        "gas_gwei": 20.0,
+        "vol_table": load_vol_table(),
+        "df_uni": uniswap_table(sorted(df["symbol"].unique())[:20]),
+        "audit_df": pd.DataFrame(),
+    }
+    inc = IncrementalEnricher()
+
+    check("first run is a full run, same as enrich()", same_as_full(inc, df, side) and inc.last_changed == n)
+    check("identical rerun re-enriches nothing", same_as_full(inc, df, side) and inc.last_changed == 0,
+          f"{inc.last_changed}/{n}")
+
+    moved = df.copy()
+    moved.loc[0, "tvlUsd"] *= 1.5
+    check("one pool moved -> one pool re-enriched", same_as_full(inc, moved, side) and inc.last_changed == 1,
+          f"{inc.last_changed}/{n}")
+
+    # The subgraph's volume / TVL change on every pull: no full recompute.
+    bumped = side["df_uni"].copy()
+    bumped.loc[0, "volume_24h_usd"] += 1.0
+    bumped.loc[1, "tvl_uniswap_usd"] *= 2.0
+    side = {**side, "df_uni": bumped}
+    check("Uniswap-only change re-enriches nothing", inc.run(moved, side) is not None and inc.last_changed == 0,
+          f"{inc.last_changed}/{n}")
+    check("... and still matches enrich()", same_as_full(inc, moved, side))
+    side = {**side, "df_uni": pd.DataFrame()}
+    check("Uniswap down -> same as enrich()", same_as_full(inc, moved, side) and inc.last_changed == 0,
+          f"{inc.last_changed}/{n}")
+
+    # Anything in the context key still forces a full run.
+    side = {**side, "gas_gwei": 200.0}
+    check("gas tier change -> full recompute", same_as_full(inc, moved, side) and inc.last_changed == n,
+          f"{inc.last_changed}/{n}")
+
+    print("all incremental checks passed")
+
+
+if __name__ == "__main__":
+    main()
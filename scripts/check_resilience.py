@@ -0,0 +1,133 @@
+# check_resilience.py
+# Exercise the per-source circuit breakers against a local stub upstream
+# that injects slowness and errors. Exits non-zero on the first failed check.
+#
+#   python scripts/check_resilience.py
+#
+# Runs in a throwaway working directory so data/cache and the Streamlit
+# secrets it needs for the gas fetcher don't touch the repo.
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from stub_upstream import StubUpstream  # noqa: E402
+
+from src import config, fetch_gas, fetch_llama, fetch_uniswap, resilience  # noqa: E402
+
+BUDGET = 0.5
+COOLDOWN = 1.0
+N_POOLS = 500
+
+
+def check(name, ok, detail=""):
+    print(f"{'ok  ' if ok else 'FAIL'} {name}{' — ' + detail if detail else ''}")
+    if not ok:
+        sys.exit(1)
+
+
+def timed(fn):
+    started = time.monotonic()
+    out = fn()
+    return out, time.monotonic() - started
+
+
+def main():
+    os.chdir(tempfile.mkdtemp(prefix="lp-screener-resilience-"))
+    os.makedirs(".streamlit")
+    with open(".streamlit/secrets.toml", "w") as f:
+        f.write('[general]\nETHERSCAN_API_KEY = "stub"\n')
+
+    config.SOURCE_LATENCY_BUDGETS = {"llama": BUDGET, "uniswap": BUDGET, "gas": BUDGET}
+    config.BREAKER_COOLDOWN_SECONDS = COOLDOWN
+    config.BREAKER_MIN_CALLS = 2
+    config.BREAKER_FAILURE_RATE = 0.5
+
+    with StubUpstream(n_pools=N_POOLS) as stub:
+        fetch_llama.LLAMA_YIELDS_URL = stub.url + "/pools"
+        fetch_uniswap.UNISWAP_V3_SUBGRAPH = stub.url + "/uniswap"
+        fetch_gas.ETHERSCAN_URL = stub.url + "/gas"
+
+        # No cache, upstream erroring: empty frame, no exception.
+        stub.set_faults("/pools", error_rate=1.0)
+        df = fetch_llama.get_yield_data()
+        check("error with no cache -> empty frame", df.empty)
+        resilience.reset()
+
+        # Healthy: data comes through and becomes the last good payload.
+        stub.set_faults()
+        df = fetch_llama.get_yield_data()
+        llama = resilience.get_breaker("llama")
+        check("healthy fetch", len(df) == N_POOLS and llama.state == resilience.CLOSED)
+        check("payload cached on disk", os.path.exists(os.path.join(resilience.CACHE_DIR, "llama.json")))
+
+        # Slow upstream: each call costs at most ~the budget and serves the cache.
+        stub.set_faults("/pools", delay=3.0)
+        df, took = timed(fetch_llama.get_yield_data)
+        check("slow upstream -> cached payload", len(df) == N_POOLS, f"{took:.2f}s")
+        check("bounded by latency budget", took < BUDGET + 0.5, f"{took:.2f}s vs {BUDGET}s budget")
+        fetch_llama.get_yield_data()
+        check("breaker opens after repeated failures", llama.state == resilience.OPEN)
+
+        # Open: no upstream call at all, instant fallback.
+        hits_before = stub.hits.get("/pools", 0)
+        df, took = timed(fetch_llama.get_yield_data)
+        check("open breaker skips upstream", stub.hits.get("/pools", 0) == hits_before)
+        check("open breaker answers fast", took < 0.1 and len(df) == N_POOLS, f"{took * 1000:.0f}ms")
+
+        # Half-open probe that fails re-opens the breaker.
+        stub.set_faults("/pools", error_rate=1.0)
+        time.sleep(COOLDOWN + 0.1)
+        fetch_llama.get_yield_data()
+        check("failed probe re-opens", llama.state == resilience.OPEN, llama.last_error)
+
+        # Half-open probe that succeeds closes it.
+        stub.set_faults()
+        time.sleep(COOLDOWN + 0.1)
+        df = fetch_llama.get_yield_data()
+        check("successful probe closes", llama.state == resilience.CLOSED and llama.serving_cache_since is None)
+
+        # Uniswap and gas go through their own breakers.
+        df_uni = fetch_uniswap.get_uniswap_pools(limit=5)
+        check("uniswap healthy", len(df_uni) == 5)
+        gas = fetch_gas.get_eth_gas_gwei()
+        check("gas healthy", gas == 23.5)
+        stub.set_faults("/gas", error_rate=1.0)
+        check("gas error -> last good reading", fetch_gas.get_eth_gas_gwei() == 23.5)
+        check("breakers are independent", llama.state == resilience.CLOSED)
+
+        # Keyed requests (the Uniswap query text) each fall back to their own
+        # last good payload, never to another query's.
+        stub.set_faults("/uniswap", error_rate=1.0)
+        check("uniswap error -> same query's last answer", len(fetch_uniswap.get_uniswap_pools(limit=5)) == 5)
+        try:
+            fetch_uniswap.get_uniswap_pools(limit=3)
+            other_query = "served another query's payload"
+        except resilience.SourceUnavailable:
+            other_query = None
+        check("other query gets no fallback", other_query is None, other_query or "")
+
+        states = {b["source"]: b["state"] for b in resilience.breaker_statuses()}
+        print("breaker states:", states)
+
+        # Trickling upstream: headers at once, then the body a chunk every
+        # 0.15s. Every socket read beats the budget, the whole call doesn't.
+        resilience.reset()
+        stub.set_faults()
+        stub.set_faults("/pools", trickle=0.15)
+        df, took = timed(fetch_llama.get_yield_data)
+        check("trickling upstream -> cached payload", len(df) == N_POOLS, f"{took:.2f}s")
+        check("trickle bounded by latency budget", took < BUDGET + 0.5, f"{took:.2f}s vs {BUDGET}s budget")
+        llama = resilience.get_breaker("llama")
+        check("trickle counts as a failure", "latency budget" in (llama.last_error or ""), llama.last_error)
+
+    print("all resilience checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# load_test_sessions.py
+# Simulate many concurrent Streamlit sessions against one process and a
+# local stub upstream, and check they share work instead of repeating it.
+# Exits non-zero on the first failed check.
+#
+#   python scripts/load_test_sessions.py [--sessions 50] [--pools 20000]
+#
+# Each session is a thread doing what one app.py rerun does: read the
+# current table from src/data_service.py (asking for a refresh if stale),
+# then filter / search / score / sort / format the leaderboard with random
+# sidebar choices. Four phases:
+#   burst       all sessions call get_yield_data() at the same instant
+#   cold start  nothing published yet, all sessions open the page at once
+#   new data    upstream changes and the table goes stale mid-session
+#   no changes  a refresh finds the same pools: the version stays, but every
+#               session sees the rewritten manifest (refreshed_utc, gas_gwei)
+# Runs in a throwaway working directory, like check_resilience.py.
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import numpy as np  # noqa: E402
+
+from stub_upstream import StubUpstream, make_pools  # noqa: E402
+
+from src import config, data_service, fetch_gas, fetch_llama, fetch_uniswap, refresh  # noqa: E402
+from src.reader import latest_manifest  # noqa: E402
+from src.scoring import SCORE_FEATURES, build_feature_matrix, composite_scores, top_k_positions  # noqa: E402
+from src.search import SearchIndex  # noqa: E402
+from src.view import IL_CHOICES, SORT_OPTIONS, build_leaderboard, filter_mask, sort_positions  # noqa: E402
+
+QUERIES = ["", "", "", "weth", "usdc usdt", "arb", "curve eth", "wbtc"]
+
+
+def check(name, ok, detail=""):
+    print(f"{'ok  ' if ok else 'FAIL'} {name}{' — ' + detail if detail else ''}")
+    if not ok:
+        sys.exit(1)
+
+
+def rerun(rng):
+    """One app.py rerun. Returns (version, table buffer address, seconds)."""
+    started = time.perf_counter()
+    manifest, df = data_service.current()
+    data_service.refresh_if_stale(manifest)
+    while manifest is None and refresh.is_refreshing():
+        time.sleep(0.1)
+        manifest, df = data_service.current()
+    if manifest is None:
+        return None, None, time.perf_counter() - started
+
+    features = data_service.artifact(manifest, "score_features", build_feature_matrix)
+    index = data_service.artifact(manifest, "search_index", SearchIndex)
+
+    chains = sorted(df["chain"].dropna().unique())
+    mask = filter_mask(
+        df,
+        chains=rng.sample(chains, rng.randint(1, len(chains))) if rng.random() < 0.5 else None,
+        min_tvl=rng.choice([0, 250000, 1000000]),
+        il_choice=rng.choice(list(IL_CHOICES)),
+        hide_red_flag=rng.random() < 0.8,
+    )
+    positions = np.flatnonzero(mask)
+    query = rng.choice(QUERIES)
+    if query:
+        positions = np.intersect1d(positions, index.search(query), assume_unique=True)
+    sort_col = SORT_OPTIONS[rng.choice(list(SORT_OPTIONS))]
+    if sort_col is None:
+        scores = composite_scores(features, {key: rng.randint(0, 10) for key in SCORE_FEATURES})
+        order = top_k_positions(scores, positions, config.SCORE_TOP_K)
+    else:
+        scores = None
+        order = sort_positions(df, positions, sort_col)
+    build_leaderboard(df, order[:config.SCORE_TOP_K], scores=scores)
+
+    buffer = df["tvlUsd"].to_numpy().__array_interface__["data"][0]
+    return manifest["version"], buffer, time.perf_counter() - started
+
+
+def run_sessions(n, target, *args):
+    """Start n session threads on the same instant; returns their results in order."""
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def session(i):
+        rng = random.Random(i)
+        barrier.wait()
+        results[i] = target(rng, *args)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def reruns(rng, count):
+    out = []
+    for _ in range(count):
+        out.append(rerun(rng))
+        time.sleep(rng.uniform(0, 0.2))  # user thinking
+    return out
+
+
+def reruns_until_new(rng, old_version, timeout):
+    out = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        out.append(rerun(rng))
+        if out[-1][0] not in (None, old_version):
+            break
+        time.sleep(rng.uniform(0.1, 0.3))
+    return out
+
+
+def summarize(name, records):
+    ms = np.array([r[2] for r in records]) * 1000
+    print(f"     {name}: {len(ms)} reruns, p50 {np.percentile(ms, 50):.0f} ms, "
+          f"p95 {np.percentile(ms, 95):.0f} ms, max {ms.max():.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--pools", type=int, default=20000)
+    parser.add_argument("--reruns", type=int, default=3)
+    parser.add_argument("--upstream-delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    fixtures = os.path.join(ROOT, "data", "fixtures")
+    os.chdir(tempfile.mkdtemp(prefix="lp-screener-load-"))
+    shutil.copytree(fixtures, os.path.join("data", "fixtures"))
+    os.makedirs(".streamlit")
+    with open(".streamlit/secrets.toml", "w") as f:
+        f.write('[general]\nETHERSCAN_API_KEY = "stub"\n')
+    # Fresh for the whole run unless a phase says otherwise, so every refresh
+    # we count was asked for by a stale table, not by a slow test machine.
+    config.REFRESH_INTERVAL_SECONDS = 3600
+
+    with StubUpstream(n_pools=args.pools) as stub:
+        fetch_llama.LLAMA_YIELDS_URL = stub.url + "/pools"
+        fetch_uniswap.UNISWAP_V3_SUBGRAPH = stub.url + "/uniswap"
+        fetch_gas.ETHERSCAN_URL = stub.url + "/gas"
+        stub.set_faults("/pools", delay=args.upstream_delay)
+        n = args.sessions
+        print(f"{n} sessions, {args.pools} pools, upstream /pools takes {args.upstream_delay}s")
+
+        # Burst: identical concurrent downloads collapse into one request.
+        frames = run_sessions(n, lambda rng: fetch_llama.get_yield_data())
+        check("burst: one upstream request", stub.hits.get("/pools", 0) == 1, f"{stub.hits.get('/pools', 0)} for {n} callers")
+        check("burst: every caller got the data", all(len(f) == args.pools for f in frames))
+        del frames  # one DataFrame per caller: that part is per session by design
+
+        # Cold start: nothing published, everyone opens the page at once.
+        stub.hits.clear()
+        started = time.monotonic()
+        phase1 = [r for rs in run_sessions(n, reruns, args.reruns) for r in rs]
+        print(f"     cold start: {time.monotonic() - started:.1f}s wall for {n} sessions x {args.reruns} reruns")
+        summarize("cold start", phase1)
+        versions = {r[0] for r in phase1}
+        check("cold start: one refresh for all sessions", stub.hits.get("/pools", 0) == 1, f"{stub.hits}")
+        check("cold start: every session saw data", None not in versions and len(versions) == 1)
+        v1 = versions.pop()
+        buffers = {r[1] for r in phase1}
+        check("cold start: one shared table", len(buffers) == 1, f"{len(buffers)} distinct buffers")
+
+        # New data: upstream moves on, the table goes stale mid-session.
+        stub.payloads["/pools"] = json.dumps({"status": "success", "data": make_pools(args.pools, seed=1)}).encode()
+        stub.hits.clear()
+        config.REFRESH_INTERVAL_SECONDS = 0  # everything is stale now
+
+        def fresh_again():
+            # once some session has started the refresh, stop calling the data stale
+            while not refresh.is_refreshing():
+                time.sleep(0.01)
+            config.REFRESH_INTERVAL_SECONDS = 3600
+
+        threading.Thread(target=fresh_again, daemon=True).start()
+        started = time.monotonic()
+        phase2 = [r for rs in run_sessions(n, reruns_until_new, v1, 120) for r in rs]
+        print(f"     new data: every session on the new version after {time.monotonic() - started:.1f}s")
+        summarize("new data", phase2)
+        check("new data: one refresh for all sessions", stub.hits.get("/pools", 0) == 1, f"{stub.hits}")
+        last_versions = {r[0] for r in phase2} - {v1, None}
+        check("new data: sessions moved to one new version", len(last_versions) == 1, str(last_versions))
+        v2 = last_versions.pop()
+        new_buffers = {r[1] for r in phase2 if r[0] == v2}
+        check("new data: one shared table for the new version", len(new_buffers) == 1, f"{len(new_buffers)} distinct buffers")
+
+        # No changes: upstream is the same, so the version stays put, but the
+        # refresh still rewrites latest.json and sessions must see that copy.
+        before, _ = data_service.current()
+        refresh.run_refresh()
+        latest = latest_manifest()
+        seen = [manifest for manifest, _ in run_sessions(n, lambda rng: data_service.current())]
+        check("no changes: version unchanged", latest["version"] == v2, f"{v2} -> {latest['version']}")
+        check("no changes: refreshed_utc moved", latest["refreshed_utc"] != before["refreshed_utc"],
+              f"{before['refreshed_utc']} -> {latest['refreshed_utc']}")
+        check("no changes: sessions see the new manifest", all(m == latest for m in seen))
+        del seen
+        loads = data_service.stats()["loads"]
+        for version in (v1, v2):
+            counts = loads.get(("table", version), {"executed": 0, "coalesced": 0})
+            check(f"table {version} loaded once", counts["executed"] == 1, f"{counts['coalesced']} concurrent loads coalesced")
+        check("service holds at most KEEP_TABLES versions", len(data_service.stats()["versions"]) <= data_service.KEEP_TABLES)
+
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"     peak RSS {rss_mb:.0f} MB")
+    print("all load-test checks passed")
+
+
+if __name__ == "__main__":
+    main()
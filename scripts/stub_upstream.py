@@ -0,0 +1,183 @@
+# stub_upstream.py
+# Local stand-in for DeFiLlama, the Uniswap subgraph and Etherscan, with
+# knobs to inject slowness and errors. Used by check_resilience.py, or run
+# it yourself and point the fetchers at it:
+#
+#   python scripts/stub_upstream.py --port 8765 --pools 20000
+#   curl "localhost:8765/_faults?path=/pools&delay=5&error_rate=0.5"
+#   curl "localhost:8765/_faults?path=/pools&trickle=0.15"   # slow body
+#
+# Endpoints:
+#   GET  /pools     DeFiLlama /pools shape: {"status": ..., "data": [...]}
+#   POST /uniswap   subgraph shape: {"data": {"pools": [...]}}
+#   GET  /gas       Etherscan gas oracle shape: {"result": {"ProposeGasPrice": ...}}
+#   GET  /_faults   set delay / error_rate / trickle for a path (or all paths)
+#
+# delay holds back the whole response; trickle sends the headers at once and
+# then the body TRICKLE_CHUNK bytes at a time, `trickle` seconds apart, so
+# every socket read succeeds but the response as a whole takes forever.
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CHAINS = ["Ethereum", "Arbitrum", "Base", "Polygon", "Optimism", "Avalanche", "BSC", "Solana"]
+PROJECTS = ["uniswap-v3", "curve", "balancer-v2", "aave-v3", "aerodrome", "pancakeswap-amm-v3", "orca"]
+TOKENS = ["USDC", "USDT", "DAI", "WETH", "WBTC", "STETH", "ARB", "OP", "LINK", "PEPE", "FRAX", "USDE"]
+TRICKLE_CHUNK = 1024  # bytes per write when a path trickles
+
+
+def make_pools(n, seed=0):
+    rng = random.Random(seed)
+    pools = []
+    for i in range(n):
+        a, b = rng.sample(TOKENS, 2)
+        pools.append({
+            "pool": f"stub-{i:06d}",
+            "chain": rng.choice(CHAINS),
+            "project": rng.choice(PROJECTS),
+            "symbol": f"{a}-{b}",
+            "tvlUsd": round(rng.lognormvariate(13, 2), 2),
+            "apyBase": round(rng.expovariate(1 / 5), 4) if rng.random() > 0.1 else None,
+            "apyReward": round(rng.expovariate(1 / 10), 4) if rng.random() > 0.5 else None,
+            "rewardTokens": None,
+        })
+    return pools
+
+
+class StubUpstream:
+    """
+    In-process stub server. Faults are per path:
+      stub.set_faults("/pools", delay=3.0, error_rate=1.0)
+      stub.set_faults("/pools", trickle=0.15)
+    stub.hits["/pools"] counts requests that reached the handler.
+    """
+
+    def __init__(self, port=0, n_pools=2000):
+        self.payloads = {
+            "/pools": json.dumps({"status": "success", "data": make_pools(n_pools)}).encode(),
+            "/uniswap": json.dumps({"data": {"pools": [
+                {
+                    "id": f"0x{i:040x}",
+                    "feeTier": "3000",
+                    "totalValueLockedUSD": "1000000",
+                    "token0": {"symbol": "USDC"},
+                    "token1": {"symbol": "WETH"},
+                    "poolDayData": [{"volumeUSD": "250000"}],
+                } for i in range(5)
+            ]}}).encode(),
+            "/gas": json.dumps({"status": "1", "result": {"ProposeGasPrice": "23.5"}}).encode(),
+        }
+        self.faults = {}
+        self.hits = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(1)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def set_faults(self, path=None, delay=0.0, error_rate=0.0, status=503, trickle=0.0):
+        paths = [path] if path else list(self.payloads)
+        with self._lock:
+            for p in paths:
+                self.faults[p] = {
+                    "delay": float(delay),
+                    "error_rate": float(error_rate),
+                    "status": int(status),
+                    "trickle": float(trickle),
+                }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _serve(self):
+                parsed = urlparse(self.path)
+                if parsed.path == "/_faults":
+                    q = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                    stub.set_faults(q.get("path"), q.get("delay", 0), q.get("error_rate", 0), q.get("status", 503),
+                                    q.get("trickle", 0))
+                    return self._send(200, b'{"ok": true}')
+
+                body = stub.payloads.get(parsed.path)
+                if body is None:
+                    return self._send(404, b'{"error": "not found"}')
+
+                with stub._lock:
+                    stub.hits[parsed.path] = stub.hits.get(parsed.path, 0) + 1
+                    fault = stub.faults.get(parsed.path, {})
+                    fail = stub._rng.random() < fault.get("error_rate", 0.0)
+                if fault.get("delay"):
+                    time.sleep(fault["delay"])
+                if fail:
+                    return self._send(fault.get("status", 503), b'{"error": "injected"}')
+                return self._send(200, body, trickle=fault.get("trickle", 0.0))
+
+            def _send(self, status, body, trickle=0.0):
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    if not trickle:
+                        self.wfile.write(body)
+                        return
+                    for start in range(0, len(body), TRICKLE_CHUNK):
+                        self.wfile.write(body[start:start + TRICKLE_CHUNK])
+                        self.wfile.flush()
+                        time.sleep(trickle)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client gave up (timeout) before we answered
+
+            def do_GET(self):
+                self._serve()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                self._serve()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub DeFiLlama / Uniswap / Etherscan with fault injection")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pools", type=int, default=2000)
+    args = parser.parse_args()
+    stub = StubUpstream(port=args.port, n_pools=args.pools)
+    print(f"stub upstream on {stub.url} (pools={args.pools}); Ctrl-C to stop")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# backtest.py
+# How did advertised APY hold up? For every pool with snapshot history
+# (data/snapshots/YYYY-MM-DD.csv, see snapshots.py) and every window W in
+# config.BACKTEST_WINDOWS days:
+#
+#   apy_realized_Wd     average advertised APY (apyBase + apyReward) over
+#                       the last W days = what an LP actually earned
+#   apy_decay_Wd        how fast it's falling: least-squares slope of APY
+#                       per day, as % of the average (positive = decaying)
+#   apy_persistence_Wd  realized / what was advertised at the start of the
+#                       window, in % (100 = held up, 30 = collapsed)
+#
+# plus apy_sustainable (True / False / None = not enough history).
+# Only completed days count (not today's snapshot, which changes every
+# refresh), so the numbers move once a day. Everything is one pass of
+# np.bincount sums over the (pool, day) rows: linear in history length
+# times pool count, no per-pool loops and no sorting.
+
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .snapshots import SNAPSHOT_DIR, load_recent_snapshots
+
+BACKTEST_COLS = [
+    f"apy_{metric}_{window}d"
+    for window in config.BACKTEST_WINDOWS
+    for metric in ("realized", "decay", "persistence")
+] + ["apy_sustainable"]
+
+# (snapshot files signature) -> metrics frame; history only changes once a day
+_cache = {"signature": None, "metrics": None}
+
+
+def compute_apy_backtest(hist: pd.DataFrame, today: str) -> pd.DataFrame:
+    """
+    hist: snapshot rows with snapshot_date (YYYY-MM-DD), pool, apyBase, apyReward.
+    Returns one row per pool (index = pool id) with BACKTEST_COLS, using
+    snapshots strictly before `today`.
+    """
+    needed = {"snapshot_date", "pool", "apyBase", "apyReward"}
+    if hist.empty or not needed <= set(hist.columns):
+        return pd.DataFrame(columns=BACKTEST_COLS, index=pd.Index([], name="pool"))
+
+    base = pd.to_numeric(hist["apyBase"], errors="coerce")
+    reward = pd.to_numeric(hist["apyReward"], errors="coerce")
+    apy = base.fillna(0) + reward.fillna(0)
+    apy = apy.where(base.notna() | reward.notna()).to_numpy(dtype=float)
+
+    dates = pd.to_datetime(hist["snapshot_date"], format="%Y-%m-%d", errors="coerce")
+    days_ago = (pd.Timestamp(today) - dates).dt.days.to_numpy(dtype=float)
+
+    keep = hist["pool"].notna().to_numpy() & ~np.isnan(apy) & (days_ago >= 1)
+    codes, pools = pd.factorize(hist["pool"][keep])
+    apy, days_ago = apy[keep], days_ago[keep]
+    n_pools = len(pools)
+
+    out = {}
+    longest_persistence = np.full(n_pools, np.nan)
+    longest_decay = np.full(n_pools, np.nan)
+    for window in config.BACKTEST_WINDOWS:
+        inside = days_ago <= window
+        c, y, x = codes[inside], apy[inside], -days_ago[inside]
+
+        n = np.bincount(c, minlength=n_pools).astype(float)
+        sy = np.bincount(c, weights=y, minlength=n_pools)
+        sx = np.bincount(c, weights=x, minlength=n_pools)
+        sxx = np.bincount(c, weights=x * x, minlength=n_pools)
+        sxy = np.bincount(c, weights=x * y, minlength=n_pools)
+
+        # APY on the oldest day in the window, per pool
+        oldest = np.zeros(n_pools)
+        np.maximum.at(oldest, c, -x)
+        first = np.full(n_pools, np.nan)
+        at_oldest = -x == oldest[c]
+        first[c[at_oldest]] = y[at_oldest]
+
+        enough = n >= max(np.ceil(window * config.BACKTEST_MIN_COVERAGE), 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            realized = np.where(enough, sy / n, np.nan)
+            denom = n * sxx - sx * sx
+            slope = np.where(enough & (denom > 0), (n * sxy - sx * sy) / denom, np.nan)
+            decay = np.where(realized > 0, -slope / realized * 100.0, np.nan)
+            persistence = np.where(enough & (first > 0), realized / first * 100.0, np.nan)
+
+        out[f"apy_realized_{window}d"] = realized
+        out[f"apy_decay_{window}d"] = decay
+        out[f"apy_persistence_{window}d"] = persistence
+
+        # windows run shortest -> longest: longer ones override where reported
+        reported = ~np.isnan(persistence) & ~np.isnan(decay)
+        longest_persistence = np.where(reported, persistence, longest_persistence)
+        longest_decay = np.where(reported, decay, longest_decay)
+
+    sustainable = pd.Series(
+        (longest_persistence >= config.SUSTAINABLE_MIN_PERSISTENCE_PCT)
+        & (longest_decay <= config.SUSTAINABLE_MAX_DECAY_PCT_PER_DAY),
+        dtype=object,
+    )
+    sustainable[np.isnan(longest_persistence)] = None
+    out["apy_sustainable"] = sustainable.to_numpy()
+
+    return pd.DataFrame(out, index=pd.Index(pools, name="pool"))[BACKTEST_COLS]
+
+
+def _snapshot_signature(days):
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return ()
+    cutoff = (datetime.utcnow() - timedelta(days=days + 1)).strftime("%Y-%m-%d")
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    sig = []
+    for fname in sorted(os.listdir(SNAPSHOT_DIR)):
+        day = fname[:-4]
+        if fname.endswith(".csv") and cutoff <= day < today:
+            stat = os.stat(os.path.join(SNAPSHOT_DIR, fname))
+            sig.append((fname, stat.st_mtime_ns, stat.st_size))
+    return (today, tuple(sig))
+
+
+def load_apy_backtest() -> pd.DataFrame:
+    """
+    compute_apy_backtest over the snapshot folder, cached until a snapshot
+    file changes or the day rolls over.
+    """
+    days = max(config.BACKTEST_WINDOWS)
+    signature = _snapshot_signature(days)
+    if signature != _cache["signature"]:
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        _cache["metrics"] = compute_apy_backtest(load_recent_snapshots(days=days), today)
+        _cache["signature"] = signature
+    return _cache["metrics"]
+
+
+def add_backtest_columns(df: pd.DataFrame, metrics: pd.DataFrame = None) -> pd.DataFrame:
+    """Adds BACKTEST_COLS to df in place, looked up by pool id. NaN / None without history."""
+    if metrics is None:
+        metrics = load_apy_backtest()
+    pos = metrics.index.get_indexer(df["pool"]) if len(metrics) else np.full(len(df), -1)
+    found = pos >= 0
+    for col in BACKTEST_COLS:
+        values = metrics[col].to_numpy()
+        if col == "apy_sustainable":
+            column = np.full(len(df), None, dtype=object)
+        else:
+            column = np.full(len(df), np.nan)
+        column[found] = values[pos[found]]
+        df[col] = column
+    return df
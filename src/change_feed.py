@@ -0,0 +1,201 @@
+# change_feed.py
+# Compact "what changed since the last refresh" log.
+#
+# After each pipeline run we diff the new table against the previous one
+# (keyed by `pool`) and write only the interesting rows:
+# - added / removed pools
+# - total_apy or tvlUsd moves beyond the thresholds in config.py
+# - pools that newly picked up a red_flag
+# Deltas are appended to data/changes/changes.jsonl (one JSON record per line)
+# so alerting can tail kilobytes instead of re-diffing the whole table. The
+# app's "What changed" panel tails it the same way (last refresh's records),
+# so it shows the same thing in every process and after a restart.
+
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from . import config
+
+CHANGES_DIR = "data/changes"
+CHANGE_LOG_PATH = os.path.join(CHANGES_DIR, "changes.jsonl")
+STATE_PATH = os.path.join(CHANGES_DIR, "last_state.csv")
+
+# What we keep from each run to diff the next one against.
+STATE_COLS = ["pool", "pool_name", "total_apy", "tvlUsd", "red_flag"]
+
+DELTA_COLS = ["timestamp_utc", "change", "pool", "pool_name", "old", "new"]
+
+# How much of the change log we read per step when tailing it.
+TAIL_BLOCK_BYTES = 64 * 1024
+
+# (log mtime, size) -> last record group, so reruns don't re-read the log.
+_latest = {"signature": None, "delta": pd.DataFrame(columns=DELTA_COLS)}
+
+
+def _state_of(df: pd.DataFrame) -> pd.DataFrame:
+    """STATE_COLS of df, one row per pool, indexed by pool."""
+    state = df.reindex(columns=STATE_COLS)
+    state = state[state["pool"].notna()].drop_duplicates("pool")
+    state = state.set_index("pool")
+    state["total_apy"] = pd.to_numeric(state["total_apy"], errors="coerce")
+    state["tvlUsd"] = pd.to_numeric(state["tvlUsd"], errors="coerce")
+    state["red_flag"] = state["red_flag"].fillna("")
+    return state
+
+
+def _moved(old: pd.Series, new: pd.Series, threshold_pct: float) -> np.ndarray:
+    """True where new differs from old by more than threshold_pct percent."""
+    old_v = old.to_numpy(dtype=float)
+    new_v = new.to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.abs(new_v - old_v) / np.abs(old_v) * 100.0
+    # 0 -> non-zero counts as a move; NaN on either side doesn't
+    pct = np.where((old_v == 0) & (new_v != 0), np.inf, pct)
+    return np.nan_to_num(pct, nan=0.0) > threshold_pct
+
+
+def compute_changes(prev: pd.DataFrame, curr: pd.DataFrame, timestamp_utc: str = None) -> pd.DataFrame:
+    """
+    Diff two scored tables keyed by pool. Returns one row per change with
+    columns timestamp_utc, change, pool, pool_name, old, new where change is
+    one of: added, removed, apy_jump, tvl_jump, new_red_flag.
+    (old/new hold total_apy for apy_jump and tvlUsd for everything else.)
+    """
+    if timestamp_utc is None:
+        timestamp_utc = datetime.utcnow().isoformat() + "Z"
+
+    p = _state_of(prev)
+    c = _state_of(curr)
+
+    added = c.index.difference(p.index, sort=False)
+    removed = p.index.difference(c.index, sort=False)
+    common = c.index.intersection(p.index, sort=False)
+    pc = p.loc[common]
+    cc = c.loc[common]
+
+    apy_jump = _moved(pc["total_apy"], cc["total_apy"], config.CHANGE_TOTAL_APY_PCT)
+    tvl_jump = _moved(pc["tvlUsd"], cc["tvlUsd"], config.CHANGE_TVL_PCT)
+    new_flag = (pc["red_flag"].to_numpy() == "") & (cc["red_flag"].to_numpy() != "")
+
+    parts = [
+        pd.DataFrame({"change": "added", "pool": added, "pool_name": c.loc[added, "pool_name"].to_numpy(),
+                      "old": np.nan, "new": c.loc[added, "tvlUsd"].to_numpy()}),
+        pd.DataFrame({"change": "removed", "pool": removed, "pool_name": p.loc[removed, "pool_name"].to_numpy(),
+                      "old": p.loc[removed, "tvlUsd"].to_numpy(), "new": np.nan}),
+        pd.DataFrame({"change": "apy_jump", "pool": common[apy_jump], "pool_name": cc["pool_name"].to_numpy()[apy_jump],
+                      "old": pc["total_apy"].to_numpy()[apy_jump], "new": cc["total_apy"].to_numpy()[apy_jump]}),
+        pd.DataFrame({"change": "tvl_jump", "pool": common[tvl_jump], "pool_name": cc["pool_name"].to_numpy()[tvl_jump],
+                      "old": pc["tvlUsd"].to_numpy()[tvl_jump], "new": cc["tvlUsd"].to_numpy()[tvl_jump]}),
+        pd.DataFrame({"change": "new_red_flag", "pool": common[new_flag], "pool_name": cc["pool_name"].to_numpy()[new_flag],
+                      "old": pc["tvlUsd"].to_numpy()[new_flag], "new": cc["tvlUsd"].to_numpy()[new_flag]}),
+    ]
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return pd.DataFrame(columns=DELTA_COLS)
+
+    delta = pd.concat(parts, ignore_index=True)
+    delta.insert(0, "timestamp_utc", timestamp_utc)
+    return delta[DELTA_COLS]
+
+
+def append_change_log(delta: pd.DataFrame):
+    """Append delta rows to the JSONL change log. Never rewrites old lines."""
+    if delta.empty:
+        return
+    os.makedirs(CHANGES_DIR, exist_ok=True)
+    with open(CHANGE_LOG_PATH, "a", encoding="utf-8") as f:
+        f.write(delta.to_json(orient="records", lines=True, force_ascii=False))  # ends with "\n"
+
+
+def record_changes(df_scored: pd.DataFrame) -> pd.DataFrame:
+    """
+    Diff df_scored against the previous run's state, append the delta to the
+    change log and store df_scored's state for next time. Returns the delta.
+    The first run (no previous state) just records state and returns empty.
+    Best-effort: never raises.
+    """
+    empty = pd.DataFrame(columns=DELTA_COLS)
+    if df_scored is None or df_scored.empty or "pool" not in df_scored.columns:
+        return empty
+
+    try:
+        prev = pd.read_csv(STATE_PATH, keep_default_na=False, na_values=[""]) if os.path.exists(STATE_PATH) else None
+    except Exception as e:
+        print(f"[change_feed] could not read previous state: {e}")
+        prev = None
+
+    delta = empty
+    try:
+        if prev is not None:
+            delta = compute_changes(prev, df_scored)
+            append_change_log(delta)
+
+        os.makedirs(CHANGES_DIR, exist_ok=True)
+        state = _state_of(df_scored).reset_index()
+        fd, tmp_path = tempfile.mkstemp(dir=CHANGES_DIR, prefix="last_state.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            state.to_csv(f, index=False)
+        os.replace(tmp_path, STATE_PATH)
+    except Exception as e:
+        print(f"[change_feed] failed: {e}")
+
+    return delta
+
+
+def _lines_from_end(f):
+    """Yield the lines of binary file f last to first, reading TAIL_BLOCK_BYTES at a time."""
+    f.seek(0, os.SEEK_END)
+    pos = f.tell()
+    partial = b""
+    while pos > 0:
+        step = min(TAIL_BLOCK_BYTES, pos)
+        pos -= step
+        f.seek(pos)
+        lines = (f.read(step) + partial).split(b"\n")
+        partial = lines.pop(0)  # may continue in the block before this one
+        yield from reversed(lines)
+    yield partial
+
+
+def _read_last_group(path: str) -> pd.DataFrame:
+    """Records of the newest timestamp_utc in the change log (one refresh's delta)."""
+    records = []
+    with open(path, "rb") as f:
+        for line in _lines_from_end(f):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # half-written line from an interrupted append
+            if records and record.get("timestamp_utc") != records[0]["timestamp_utc"]:
+                break
+            records.append(record)
+    records.reverse()
+    return pd.DataFrame(records).reindex(columns=DELTA_COLS)
+
+
+def latest_changes() -> pd.DataFrame:
+    """
+    Most recent non-empty delta, read from the end of the change log (so it
+    survives restarts and is the same in every process). Empty if there is
+    no log yet.
+    """
+    try:
+        stat = os.stat(CHANGE_LOG_PATH)
+    except OSError:
+        return pd.DataFrame(columns=DELTA_COLS)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if signature != _latest["signature"]:
+        try:
+            _latest["delta"] = _read_last_group(CHANGE_LOG_PATH)
+        except Exception as e:
+            print(f"[change_feed] could not read {CHANGE_LOG_PATH}: {e}")
+            return pd.DataFrame(columns=DELTA_COLS)
+        _latest["signature"] = signature
+    return _latest["delta"]
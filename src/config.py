@@ -12,6 +12,76 @@ MIN_TVL_DEFAULT = 250000  # $250k
 # because gas is high and exit risk is higher.
 RED_FLAG_TVL_ETH_THRESHOLD = 250000  # $250k
 
+# app.py shows the last published table right away and refreshes it in the
+# background once it is older than this.
+REFRESH_INTERVAL_SECONDS = 300
+
+# Upstream resilience (see resilience.py). Latency budget per source in
+# seconds: a deadline on the whole call, body included. A call that hasn't
+# finished by then counts as a failure and we serve the last good payload.
+SOURCE_LATENCY_BUDGETS = {
+    "llama": 20,
+    "uniswap": 8,
+    "gas": 5,
+}
+DEFAULT_LATENCY_BUDGET = 10
+# Breaker opens when at least BREAKER_MIN_CALLS of the last BREAKER_WINDOW
+# calls were made and BREAKER_FAILURE_RATE of them failed, then lets one
+# probe through after BREAKER_COOLDOWN_SECONDS.
+BREAKER_WINDOW = 10
+BREAKER_MIN_CALLS = 3
+BREAKER_FAILURE_RATE = 0.5
+BREAKER_COOLDOWN_SECONDS = 120
+
+# Only re-enrich pools whose inputs changed since the previous refresh
+# (see incremental.py). Set False to always recompute the whole table.
+INCREMENTAL_ENRICHMENT = True
+
+# Enrich big tables in a process pool (see parallel.py). 0 or 1 = single core.
+# Below PARALLEL_MIN_ROWS the process start-up costs more than it saves.
+PARALLEL_WORKERS = 0
+PARALLEL_MIN_ROWS = 50000
+
+# Change feed (see change_feed.py): a pool shows up as an APY / TVL jump
+# when the value moved by more than this many percent since the last refresh.
+CHANGE_TOTAL_APY_PCT = 25.0
+CHANGE_TVL_PCT = 20.0
+
+# Impermanent-loss Monte Carlo (see il_sim.py): expected and tail IL of a
+# 50/50 pool over IL_HORIZON_DAYS, tail = average of the worst
+# IL_TAIL_QUANTILE of outcomes. Tokens with no history or fixture get
+# IL_DEFAULT_VOL (annualized). Without price history, two tokens with the
+# same peg (USD, ETH, BTC) move with IL_SAME_PEG_CORRELATION, others with
+# IL_CROSS_CORRELATION.
+IL_HORIZON_DAYS = 30
+IL_SIMULATIONS = 20000
+IL_TAIL_QUANTILE = 0.05
+IL_DEFAULT_VOL = 1.0
+IL_SAME_PEG_CORRELATION = 0.98
+IL_CROSS_CORRELATION = 0.5
+
+# APY backtest (see backtest.py): windows in days, and how many of a window's
+# days need a snapshot before we report it. A pool's yield counts as
+# sustainable when, over its longest reported window, it paid at least
+# SUSTAINABLE_MIN_PERSISTENCE_PCT of what it advertised at the start and
+# decayed by no more than SUSTAINABLE_MAX_DECAY_PCT_PER_DAY.
+BACKTEST_WINDOWS = (7, 30, 90)
+BACKTEST_MIN_COVERAGE = 0.5
+SUSTAINABLE_MIN_PERSISTENCE_PCT = 80.0
+SUSTAINABLE_MAX_DECAY_PCT_PER_DAY = 1.0
+
+# Composite score (see scoring.py): default sidebar weight (0-10) per
+# feature, and how many top-scoring pools the leaderboard shows.
+SCORE_WEIGHTS_DEFAULT = {
+    "fee_share": 3,     # fee APY / total APY: real yield vs incentives
+    "vol_to_tvl": 2,    # capital efficiency
+    "tvl": 3,           # size
+    "tvl_trend": 1,     # money flowing in over 7d
+    "il_tier": 2,       # Low > Medium > High impermanent loss risk
+    "no_red_flag": 4,   # no ⚠
+}
+SCORE_TOP_K = 500
+
 # Mapping of protocol/project names (from DeFiLlama "project") to human safety notes.
 # We will expand this over time.
 PROTOCOL_SAFETY = {
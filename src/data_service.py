@@ -0,0 +1,119 @@
+# data_service.py
+# The one copy of the data that every Streamlit session in this process reads.
+#
+# - current() returns the latest published version as a pandas frame. Each
+#   version is loaded from data/published once, however many sessions ask
+#   at the same moment (their loads are coalesced), and kept for as long as
+#   it is one of the newest KEEP_TABLES versions. The manifest is re-read on
+#   every call: a refresh that finds no changes keeps the version but still
+#   moves refreshed_utc and gas_gwei forward.
+# - artifact() does the same for things derived from a version's table
+#   (score features, search index): built once per version, shared.
+# - refresh_if_stale() asks refresh.py for a refresh; one runs per process
+#   at a time, whoever asks.
+#
+# Sessions get the table by reference: a shallow copy that shares every
+# column buffer with the service's frame. Under pandas copy-on-write (the
+# only mode from pandas 3, which requirements.txt pins) a session writing to
+# its copy only copies the columns it touches, so the shared frame never
+# changes after it is loaded.
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from . import config, refresh
+from .reader import latest_manifest, open_latest
+from .resilience import SingleFlight
+
+KEEP_TABLES = 2  # current version + the one sessions may still be rendering
+
+_lock = threading.Lock()
+_flight = SingleFlight()
+_versions = OrderedDict()  # version -> {"manifest" (as loaded), "table", "artifacts"}
+
+
+def _load_latest():
+    table, manifest = open_latest()
+    if table is None:
+        return None
+    entry = {"manifest": manifest, "table": table.to_pandas(), "artifacts": {}}
+    with _lock:
+        _versions[manifest["version"]] = entry
+        _versions.move_to_end(manifest["version"])
+        while len(_versions) > KEEP_TABLES:
+            _versions.popitem(last=False)
+    return entry
+
+
+def _entry(manifest):
+    with _lock:
+        entry = _versions.get(manifest["version"])
+    if entry is None:
+        entry = _flight.do(("table", manifest["version"]), _load_latest)
+    return entry
+
+
+def current():
+    """
+    (manifest, table) for the latest published version, or (None, None) if
+    nothing has been published yet. The manifest always describes the table,
+    and is the current latest.json, not the one read when the table loaded.
+    """
+    manifest = latest_manifest()
+    if manifest is None:
+        return None, None
+    entry = _entry(manifest)
+    if entry is None:
+        return None, None
+    if entry["manifest"]["version"] != manifest["version"]:
+        manifest = entry["manifest"]  # a newer version was published while we loaded
+    return manifest, entry["table"].copy(deep=False)
+
+
+def artifact(manifest, name, build):
+    """
+    build(table) for manifest's version, computed once per version and
+    shared. build must not modify the table.
+    """
+    entry = _entry(manifest)
+    with _lock:
+        if name in entry["artifacts"]:
+            return entry["artifacts"][name]
+
+    def _build():
+        value = build(entry["table"])
+        with _lock:
+            entry["artifacts"][name] = value
+        return value
+
+    return _flight.do(("artifact", name, entry["manifest"]["version"]), _build)
+
+
+def data_age_seconds(manifest):
+    """Seconds since the manifest's data was last refreshed, or None."""
+    refreshed = (manifest or {}).get("refreshed_utc")
+    if not refreshed:
+        return None
+    return (datetime.utcnow() - datetime.fromisoformat(refreshed.rstrip("Z"))).total_seconds()
+
+
+def refresh_if_stale(manifest) -> bool:
+    """
+    Start a background refresh if the data is older than
+    config.REFRESH_INTERVAL_SECONDS (or missing) and we haven't just tried;
+    the second check stops a failing upstream from turning every rerun of
+    every session into a new attempt. Returns True if a refresh is running.
+    """
+    age = data_age_seconds(manifest)
+    stale = age is None or age > config.REFRESH_INTERVAL_SECONDS
+    if stale and refresh.seconds_since_last_refresh() > config.REFRESH_INTERVAL_SECONDS:
+        refresh.start_refresh()
+    return refresh.is_refreshing()
+
+
+def stats() -> dict:
+    """What the service holds and how much work it shared (for load tests / debugging)."""
+    with _lock:
+        versions = list(_versions)
+    return {"versions": versions, "loads": _flight.counts()}
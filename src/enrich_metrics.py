@@ -1,14 +1,46 @@
 # enrich_metrics.py
 # Turn raw DeFiLlama data into the columns we actually want to display.
+# Stage functions add columns to the frame they're given (in place); the
+# pipeline owns that frame and declares what each stage reads/writes.
 
+import numpy as np
 import pandas as pd
 from . import config
 from .fetch_uniswap import get_uniswap_pools
 
+# Sentinel for "caller didn't pass this in, go fetch it yourself".
+FETCH = object()
 
-def add_basic_columns(df: pd.DataFrame) -> pd.DataFrame:
+UNISWAP_COLS = ["volume_24h_usd", "tvl_uniswap_usd", "vol_to_tvl", "feeTier"]
+
+
+def gas_penalty(gas_gwei):
     """
-    Create core derived columns:
+    Fraction of total APY we shave off on high-gas chains for a given gas price.
+    Returns None if we have no live gas reading.
+    """
+    if gas_gwei is None:
+        return None
+    if gas_gwei > 100:
+        return 0.9
+    if gas_gwei > 50:
+        return 0.6
+    if gas_gwei > 25:
+        return 0.3
+    return 0.15
+
+
+def fetch_uniswap_table() -> pd.DataFrame:
+    """Top Uniswap pools, or an empty frame if the subgraph is unavailable."""
+    try:
+        return get_uniswap_pools(limit=50)
+    except Exception:
+        return pd.DataFrame()
+
+
+def add_basic_columns(df: pd.DataFrame, gas_gwei=FETCH) -> pd.DataFrame:
+    """
+    Add core derived columns to df (in place) and return it:
     - fee_apy (from apyBase)
     - reward_apy (from apyReward)
     - total_apy
@@ -16,53 +48,37 @@ def add_basic_columns(df: pd.DataFrame) -> pd.DataFrame:
     - net_yield_after_gas (heuristic)
     - il_risk (heuristic)
     - pool_name ("<symbol> | <project> | <chain>")
-    Also attach Uniswap-specific volume (+ vol_to_tvl) if we can match.
-    """
-    df = df.copy()
 
+    gas_gwei can be passed in when the caller already fetched it
+    (e.g. when enriching in chunks), otherwise we fetch it here.
+    """
     # base APYs
-    df["fee_apy"] = df.get("apyBase", 0).fillna(0)
-    df["reward_apy"] = df.get("apyReward", 0).fillna(0)
+    df["fee_apy"] = df["apyBase"].fillna(0)
+    df["reward_apy"] = df["apyReward"].fillna(0)
     df["total_apy"] = df["fee_apy"] + df["reward_apy"]
 
     # gas_context: cheap vs expensive based on chain
-    def classify_gas(chain):
-        if chain in config.CHEAP_GAS_CHAINS:
-            return "Cheap gas"
-        if chain in config.EXPENSIVE_GAS_CHAINS:
-            return "High gas"
-        return "Unknown"
-    df["gas_context"] = df["chain"].apply(classify_gas)
-
-    from .fetch_gas import get_eth_gas_gwei
-
-def est_net_yield(row):
-    total = row["total_apy"] or 0
-    gas_context = row.get("gas_context", "")
-    gas_gwei = get_eth_gas_gwei()
-
-    # Default heuristic if no live data
-    if gas_gwei is None:
-        if gas_context == "High gas" and total < 8:
-            return 0.5
-        return total
-
-    # Use live gas
-    if gas_context == "High gas":
-        # adjust yield penalty based on gas range
-        if gas_gwei > 100:
-            penalty = 0.9
-        elif gas_gwei > 50:
-            penalty = 0.6
-        elif gas_gwei > 25:
-            penalty = 0.3
-        else:
-            penalty = 0.15
-        return max(total - penalty * total, 0.2)
-
-    # cheaper chains - minimal penalty
-    return total
-
+    df["gas_context"] = np.select(
+        [df["chain"].isin(config.CHEAP_GAS_CHAINS), df["chain"].isin(config.EXPENSIVE_GAS_CHAINS)],
+        ["Cheap gas", "High gas"],
+        default="Unknown",
+    )
+
+    # net_yield_after_gas: one gas reading for the whole table, not one per row
+    if gas_gwei is FETCH:
+        from .fetch_gas import get_eth_gas_gwei
+        gas_gwei = get_eth_gas_gwei()
+    penalty = gas_penalty(gas_gwei)
+
+    total = df["total_apy"].to_numpy()
+    high_gas = (df["gas_context"] == "High gas").to_numpy()
+    if penalty is None:
+        # Default heuristic if no live data
+        net = np.where(high_gas & (total < 8), 0.5, total)
+    else:
+        # Use live gas; cheaper chains - minimal penalty
+        net = np.where(high_gas, np.maximum(total - penalty * total, 0.2), total)
+    df["net_yield_after_gas"] = net
 
     # il_risk heuristic
     def guess_il(symbol: str):
@@ -83,73 +99,33 @@ def est_net_yield(row):
             return "Medium"
         # else assume High
         return "High"
-    df["il_risk"] = df["symbol"].apply(guess_il)
-
-    # pool_name for display
-    def make_pool_name(row):
-        sym = row.get("symbol", "<?>")
-        proj = row.get("project", "<?>")
-        chain = row.get("chain", "<?>")
-        return f"{sym} | {proj} | {chain}"
-    df["pool_name"] = df.apply(make_pool_name, axis=1)
-
-    # --- NEW: Uniswap metrics merge ---
-    # Get top Uniswap pools and merge on symbol if project is uniswap-v3
-    try:
-        df_uni = get_uniswap_pools(limit=50)
-    except Exception:
-        df_uni = pd.DataFrame()
-
-    # We'll only merge where project == "uniswap-v3"
-    if not df_uni.empty:
-        df_uni_subset = df_uni[["symbol", "volume_24h_usd", "tvl_uniswap_usd", "vol_to_tvl", "feeTier"]].copy()
-
-        df = df.merge(
-            df_uni_subset,
-            on="symbol",
-            how="left",
-            suffixes=("", "_uniswap")
-        )
+    df["il_risk"] = df["symbol"].map(guess_il).astype(object)
 
-    # If we got Uniswap data, great. If not, fill safe defaults.
-    for col in ["volume_24h_usd", "tvl_uniswap_usd", "vol_to_tvl", "feeTier"]:
-        if col not in df.columns:
-            df[col] = None
+    # pool_name for display: "<symbol> | <project> | <chain>"
+    df["pool_name"] = (
+        df["symbol"].fillna("<?>").astype(str) + " | "
+        + df["project"].fillna("<?>").astype(str) + " | "
+        + df["chain"].fillna("<?>").astype(str)
+    ).astype(object)
 
     return df
 
-from .snapshots import compute_tvl_trend_7d, save_today_snapshot
-import pandas as pd
 
-def add_trend_columns_and_snapshot(df):
+def add_uniswap_columns(df: pd.DataFrame, df_uni=FETCH) -> pd.DataFrame:
     """
-    Safety-first:
-    - If df is None or not a DataFrame, return an empty DataFrame
-      with tvl_trend_7d = "—".
-    - Otherwise, try to save a snapshot and compute 7d trend.
-    - Never raise. Always return a DataFrame.
+    Attach Uniswap-specific volume (+ vol_to_tvl, feeTier) to df in place,
+    matched on symbol. Columns are NaN where we have no match (or no data).
     """
-
-    # Guard up front so we NEVER pass None downstream
-    if df is None or not isinstance(df, pd.DataFrame):
-        safe_df = pd.DataFrame()
-        safe_df["tvl_trend_7d"] = "—"
-        return safe_df
-
-    # Try to save today's snapshot (best-effort)
-    try:
-        save_today_snapshot(df)
-    except Exception as e:
-        print(f"[trend] snapshot save failed: {e}")
-
-    # Try to compute tvl_trend_7d (best-effort)
-    try:
-        df_with_trend = compute_tvl_trend_7d(df)
-        return df_with_trend
-    except Exception as e:
-        print(f"[trend] compute_tvl_trend_7d failed: {e}")
-        fallback = df.copy()
-        fallback["tvl_trend_7d"] = "—"
-        return fallback
-
-
+    if df_uni is FETCH:
+        df_uni = fetch_uniswap_table()
+
+    if df_uni is None or df_uni.empty:
+        for col in UNISWAP_COLS:
+            df[col] = np.nan
+        return df
+
+    # One row per symbol (the busiest pool, since the subgraph orders by volume)
+    lookup = df_uni.drop_duplicates("symbol").set_index("symbol")
+    for col in UNISWAP_COLS:
+        df[col] = df["symbol"].map(lookup[col]).astype("float64")
+    return df
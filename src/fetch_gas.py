@@ -5,34 +5,45 @@
 import streamlit as st
 import requests
 
+from .resilience import SourceUnavailable, guarded_fetch
+
 ETHERSCAN_URL = "https://api.etherscan.io/api"
 
 def get_eth_gas_gwei():
     """
     Returns current gas price (Gwei) from Etherscan Gas Oracle API.
-    Falls back to None if API is unavailable or key missing.
+    Goes through the "gas" circuit breaker (last good reading if Etherscan is
+    down). Falls back to None if nothing is available or key missing.
     """
     try:
         api_key = st.secrets["general"]["ETHERSCAN_API_KEY"]
     except Exception:
         return None
 
-    try:
-        response = requests.get(
-            ETHERSCAN_URL,
-            params={
-                "module": "gastracker",
-                "action": "gasoracle",
-                "apikey": api_key,
-            },
-            timeout=15,
-        )
-        response.raise_for_status()
+    def download(timeout):
+        try:
+            response = requests.get(
+                ETHERSCAN_URL,
+                params={
+                    "module": "gastracker",
+                    "action": "gasoracle",
+                    "apikey": api_key,
+                },
+                timeout=timeout,
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            # requests puts the full URL (apikey included) in its messages,
+            # and breaker errors end up in logs and the sidebar.
+            raise RuntimeError(str(e).replace(api_key, "***")) from None
         data = response.json()
         result = data.get("result", {})
-        gwei = result.get("ProposeGasPrice")
-        if gwei:
-            return float(gwei)
-        return None
-    except Exception:
+        if not isinstance(result, dict) or not result.get("ProposeGasPrice"):
+            raise ValueError(f"unexpected gas oracle payload: {result!r}")
+        return result
+
+    try:
+        result = guarded_fetch("gas", download)
+        return float(result["ProposeGasPrice"])
+    except (SourceUnavailable, TypeError, ValueError):
         return None
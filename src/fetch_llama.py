@@ -5,8 +5,19 @@
 import requests
 import pandas as pd
 
+from .resilience import guarded_fetch
+
 LLAMA_YIELDS_URL = "https://yields.llama.fi/pools"  # DeFiLlama yields endpoint
 
+
+def _download(timeout):
+    resp = requests.get(LLAMA_YIELDS_URL, timeout=timeout)
+    resp.raise_for_status()
+    data = resp.json()
+    if not isinstance(data.get("data"), list):
+        raise ValueError("unexpected DeFiLlama payload")
+    return data
+
 def get_yield_data():
     """
     Fetch pool/yield data from DeFiLlama and return as a pandas DataFrame.
@@ -20,11 +31,12 @@ def get_yield_data():
     - apyReward (reward/incentive APY)
     - rewardTokens (what's paying incentives)
     - pool (unique pool id string)
+
+    Goes through the "llama" circuit breaker, so a slow / down DeFiLlama
+    gives us the last good payload instead of a 30s hang.
     """
     try:
-        resp = requests.get(LLAMA_YIELDS_URL, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
+        data = guarded_fetch("llama", _download)
         pools = data.get("data", [])
         df = pd.DataFrame(pools)
     except Exception as e:
@@ -5,13 +5,17 @@
 import requests
 import pandas as pd
 
+from .resilience import guarded_fetch
+
 UNISWAP_V3_SUBGRAPH = "https://api.thegraph.com/subgraphs/name/uniswap/uniswap-v3"
 
 def _run_query(query: str):
-    resp = requests.post(UNISWAP_V3_SUBGRAPH, json={"query": query}, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
-    return data["data"]
+    # Behind the "uniswap" circuit breaker (falls back to the last good answer)
+    def post(timeout):
+        resp = requests.post(UNISWAP_V3_SUBGRAPH, json={"query": query}, timeout=timeout)
+        resp.raise_for_status()
+        return resp.json()["data"]
+    return guarded_fetch("uniswap", post, key=query)
 
 def get_uniswap_pools(limit=50):
     """
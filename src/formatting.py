@@ -8,12 +8,14 @@ import pandas as pd
 def _format_usd(x):
     """
     Turn a raw number like 1234567.89 into something like "$1.23M".
-    If x is missing or not a number, return "-".
+    If x is missing (None / NaN) or not a number, return "-".
     """
     try:
         val = float(x)
     except (TypeError, ValueError):
         return "-"
+    if pd.isna(val):
+        return "-"
 
     if val >= 1_000_000_000:
         return f"${val/1_000_000_000:.2f}B"
@@ -33,6 +35,8 @@ def _format_pct(x):
         val = float(x)
     except (TypeError, ValueError):
         return "-"
+    if pd.isna(val):
+        return "-"
     return f"{val:.1f}%"
 
 
@@ -40,7 +44,7 @@ def _format_tvl_trend(v):
     """
     Takes something like +12.34 and returns '▲ +12.3%'.
     Takes something like -5.2 and returns '▼ -5.2%'.
-    For placeholder '—', just return '—'.
+    For placeholder '—' (or NaN, how published tables store it), return '—'.
     """
     if v == "—":
         return "—"
@@ -48,6 +52,8 @@ def _format_tvl_trend(v):
         val = float(v)
     except (TypeError, ValueError):
         return "—"
+    if pd.isna(val):
+        return "—"
 
     arrow = "▲" if val >= 0 else "▼"
     return f"{arrow} {val:.1f}%"
@@ -55,17 +61,18 @@ def _format_tvl_trend(v):
 
 def format_for_display(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Returns a NEW dataframe (safe to display) with pretty strings for:
+    Replaces numbers with pretty strings, IN PLACE (pass a frame you own,
+    e.g. the one view.build_leaderboard builds) and returns it, for:
     - TVL ($)
     - Fee APY (%)
     - Reward APY (%)
     - Total APY (%)
     - Net Yield After Gas (%)
+    - Exp. IL (%) / Tail IL (%)
+    - Realized APY 30d (%) / APY Held Up 30d (%)
     - TVL Trend (7d)
     We leave flags, IL risk, audit status, etc. as-is because those are already short labels.
     """
-    df = df.copy()
-
     if "TVL ($)" in df.columns:
         df["TVL ($)"] = df["TVL ($)"].apply(_format_usd)
 
@@ -81,6 +88,18 @@ def format_for_display(df: pd.DataFrame) -> pd.DataFrame:
     if "Net Yield After Gas (%)" in df.columns:
         df["Net Yield After Gas (%)"] = df["Net Yield After Gas (%)"].apply(_format_pct)
 
+    if "Exp. IL (%)" in df.columns:
+        df["Exp. IL (%)"] = df["Exp. IL (%)"].apply(_format_pct)
+
+    if "Tail IL (%)" in df.columns:
+        df["Tail IL (%)"] = df["Tail IL (%)"].apply(_format_pct)
+
+    if "Realized APY 30d (%)" in df.columns:
+        df["Realized APY 30d (%)"] = df["Realized APY 30d (%)"].apply(_format_pct)
+
+    if "APY Held Up 30d (%)" in df.columns:
+        df["APY Held Up 30d (%)"] = df["APY Held Up 30d (%)"].apply(_format_pct)
+
     if "TVL Trend (7d)" in df.columns:
         df["TVL Trend (7d)"] = df["TVL Trend (7d)"].apply(_format_tvl_trend)
 
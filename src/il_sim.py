@@ -0,0 +1,186 @@
+# il_sim.py
+# Quantitative impermanent loss: for each pool, simulate the pair's price
+# ratio over a horizon and measure what a 50/50 constant-product position
+# loses vs just holding the two tokens.
+#
+#   expected IL = average loss over all simulated outcomes
+#   tail IL     = average loss over the worst IL_TAIL_QUANTILE of outcomes
+#
+# Volatility per token comes from local price history (data/prices/*.csv:
+# date, token, price_usd) when there's enough of it, otherwise from
+# data/fixtures/token_vols.csv. Pairs are simulated all at once as one
+# (pairs x simulations) NumPy array, and results are cached per
+# (token pair, horizon, volatility version), so a refresh only simulates
+# pairs it hasn't seen with the current volatility data.
+
+import glob
+import hashlib
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from . import config
+
+VOL_FIXTURES = "data/fixtures/token_vols.csv"
+PRICE_HISTORY_DIR = "data/prices"
+MIN_HISTORY_DAYS = 30  # fewer daily returns than this: use the fixture vol
+
+# Upper bound on simulated cells held in memory at once (pairs x simulations).
+BATCH_CELLS = 250_000
+
+# (tokens, horizon_days, vol_version) -> (expected_il_pct, tail_il_pct)
+_cache = {}
+
+
+def split_tokens(symbol) -> tuple:
+    """'WETH-USDC' -> ('USDC', 'WETH'): upper-case, de-duplicated, sorted."""
+    if not isinstance(symbol, str) or not symbol.strip():
+        return ()
+    return tuple(sorted({t for t in re.split(r"[-/+ ]+", symbol.upper()) if t}))
+
+
+def _file_digest(paths) -> str:
+    h = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        h.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def load_vol_table() -> dict:
+    """
+    Volatility inputs for add_il_columns:
+    - vols:    Series token -> annualized volatility
+    - pegs:    Series token -> peg group ("USD", "ETH", "BTC") or NaN
+    - corr:    token x token correlation of daily log returns (history only)
+    - version: changes whenever the fixture or history files change
+    """
+    fixture_paths = [VOL_FIXTURES] if os.path.exists(VOL_FIXTURES) else []
+    history_paths = sorted(glob.glob(os.path.join(PRICE_HISTORY_DIR, "*.csv")))
+
+    if fixture_paths:
+        fixtures = pd.read_csv(VOL_FIXTURES)
+        fixtures["token"] = fixtures["token"].str.upper()
+        fixtures = fixtures.drop_duplicates("token", keep="last").set_index("token")
+        vols = fixtures["annual_vol"].astype(float)
+        pegs = fixtures["peg"]
+    else:
+        print(f"[il_sim] no {VOL_FIXTURES}, every token gets IL_DEFAULT_VOL")
+        vols = pd.Series(dtype=float)
+        pegs = pd.Series(dtype=object)
+
+    corr = pd.DataFrame()
+    if history_paths:
+        try:
+            prices = pd.concat([pd.read_csv(p) for p in history_paths], ignore_index=True)
+            prices["token"] = prices["token"].str.upper()
+            wide = prices.pivot_table(index="date", columns="token", values="price_usd", aggfunc="last").sort_index()
+            returns = np.log(wide).diff().iloc[1:]
+            enough = returns.count() >= MIN_HISTORY_DAYS
+            returns = returns.loc[:, enough]
+            if not returns.empty:
+                vols = returns.std().mul(np.sqrt(365)).combine_first(vols)
+                corr = returns.corr(min_periods=MIN_HISTORY_DAYS)
+        except Exception as e:
+            print(f"[il_sim] price history unreadable, using fixtures only: {e}")
+
+    return {
+        "vols": vols,
+        "pegs": pegs,
+        "corr": corr,
+        "version": _file_digest(fixture_paths + history_paths),
+    }
+
+
+def _ratio_vol(a: str, b: str, vol_table: dict) -> float:
+    """Annualized volatility of the a/b price ratio."""
+    vols, pegs, corr = vol_table["vols"], vol_table["pegs"], vol_table["corr"]
+    sa = float(vols.get(a, config.IL_DEFAULT_VOL))
+    sb = float(vols.get(b, config.IL_DEFAULT_VOL))
+
+    rho = np.nan
+    if a in corr.index and b in corr.columns:
+        rho = corr.at[a, b]
+    if pd.isna(rho):
+        peg_a, peg_b = pegs.get(a), pegs.get(b)
+        same_peg = isinstance(peg_a, str) and peg_a == peg_b
+        rho = config.IL_SAME_PEG_CORRELATION if same_peg else config.IL_CROSS_CORRELATION
+
+    return float(np.sqrt(max(sa * sa + sb * sb - 2.0 * rho * sa * sb, 0.0)))
+
+
+def pool_ratio_vol(tokens: tuple, vol_table: dict) -> float:
+    """
+    Ratio volatility that drives IL for a pool. Single-token pools have none (0).
+    Pools with 3+ tokens use their most volatile pair, a conservative stand-in.
+    """
+    if len(tokens) < 2:
+        return 0.0
+    return max(_ratio_vol(a, b, vol_table) for i, a in enumerate(tokens) for b in tokens[i + 1:])
+
+
+def simulate_il(ratio_vols: np.ndarray, horizon_days: float, n_sims: int = None,
+                tail_quantile: float = None, seed: int = 0):
+    """
+    Monte Carlo IL for many pairs at once. The price ratio follows a
+    driftless geometric Brownian motion, so at the horizon
+        log r = -s^2 T / 2 + s sqrt(T) Z
+    and a 50/50 constant-product position is worth 2 sqrt(r) / (1 + r) of
+    holding. IL only depends on where the ratio ends up, so we draw the
+    terminal ratio directly instead of stepping whole paths.
+    Every pair shares the same draws Z (common random numbers): results are
+    reproducible and pairs with equal volatility get equal IL.
+    Returns (expected_il_pct, tail_il_pct), losses as positive percentages.
+    """
+    n_sims = n_sims or config.IL_SIMULATIONS
+    tail_quantile = tail_quantile or config.IL_TAIL_QUANTILE
+    ratio_vols = np.asarray(ratio_vols, dtype=float)
+    years = horizon_days / 365.0
+    z = np.random.default_rng(seed).standard_normal(n_sims)
+    n_tail = max(int(round(n_sims * tail_quantile)), 1)
+
+    expected = np.empty(len(ratio_vols))
+    tail = np.empty(len(ratio_vols))
+    batch = max(BATCH_CELLS // n_sims, 1)
+    for start in range(0, len(ratio_vols), batch):
+        s = ratio_vols[start:start + batch, None]
+        log_r = -0.5 * s * s * years + s * np.sqrt(years) * z[None, :]
+        # 2 sqrt(r) / (1 + r) == 1 / cosh(log r / 2)
+        loss = 1.0 - 1.0 / np.cosh(0.5 * log_r)
+        expected[start:start + batch] = loss.mean(axis=1)
+        worst = np.partition(loss, n_sims - n_tail, axis=1)[:, n_sims - n_tail:]
+        tail[start:start + batch] = worst.mean(axis=1)
+    return expected * 100.0, tail * 100.0
+
+
+def add_il_columns(df: pd.DataFrame, vol_table: dict = None, horizon_days: float = None) -> pd.DataFrame:
+    """
+    Adds, in place:
+    - il_expected_pct: expected IL over the horizon (% of position vs holding)
+    - il_tail_pct:     average IL in the worst IL_TAIL_QUANTILE of outcomes
+    NaN where the symbol is missing. Only pairs not already cached for this
+    (horizon, volatility version) are simulated.
+    """
+    if vol_table is None:
+        vol_table = load_vol_table()
+    horizon_days = horizon_days or config.IL_HORIZON_DAYS
+    version = vol_table["version"]
+    for key in [key for key in _cache if key[2] != version]:
+        del _cache[key]  # volatility data moved on
+
+    symbols = df["symbol"].dropna().unique()
+    tokens_by_symbol = {sym: split_tokens(sym) for sym in symbols}
+
+    missing = sorted({t for t in tokens_by_symbol.values() if t and (t, horizon_days, version) not in _cache})
+    if missing:
+        expected, tail = simulate_il([pool_ratio_vol(t, vol_table) for t in missing], horizon_days)
+        for tokens, e, t in zip(missing, expected, tail):
+            _cache[(tokens, horizon_days, version)] = (float(e), float(t))
+
+    results = {sym: _cache[(tokens, horizon_days, version)] for sym, tokens in tokens_by_symbol.items() if tokens}
+    df["il_expected_pct"] = df["symbol"].map({sym: r[0] for sym, r in results.items()}).astype("float64")
+    df["il_tail_pct"] = df["symbol"].map({sym: r[1] for sym, r in results.items()}).astype("float64")
+    return df
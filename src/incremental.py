@@ -0,0 +1,153 @@
+# incremental.py
+# Re-enrich only the pools that changed since the last refresh.
+#
+# Between two DeFiLlama pulls most pools are identical, so instead of running
+# the whole enrichment chain over every row we:
+# - hash the input columns of each pool (keyed by `pool` id)
+# - re-run the chain only for new / changed pools
+# - splice those rows into the previous enriched result
+# Anything a row's output depends on besides its own inputs (gas tier,
+# volatility data, audit table, 7d TVL baseline, APY backtest) is part of a
+# "context" key; if that moves we just recompute everything.
+# The Uniswap table is the exception: its volume / TVL move on every pull,
+# so keying on it would make every refresh a full one. Its stage is a
+# vectorized lookup by symbol, so we re-run it over the whole spliced table
+# instead (RERUN_STAGES).
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .enrich_metrics import gas_penalty
+from .pipeline import DERIVED_COLS, INPUT_COLS, STAGES, enrich, fetch_side_inputs, prepare_input, with_trend_baseline
+
+# Stages re-run on every row each refresh rather than cached per row. Their
+# side inputs stay out of the context key, and no other stage may read what
+# they write (checked below), so the cached columns never go stale.
+RERUN_STAGES = ("uniswap",)
+
+
+def _check_rerun_stages(stages):
+    rerun_writes = {col for stage in stages if stage.name in RERUN_STAGES for col in stage.writes}
+    for stage in stages:
+        stale = rerun_writes & set(stage.reads)
+        if stale and stage.name not in RERUN_STAGES:
+            raise RuntimeError(f"stage {stage.name!r} reads {sorted(stale)}, which RERUN_STAGES recompute every refresh")
+
+
+_check_rerun_stages(STAGES)
+
+
+def _frame_fingerprint(df) -> int:
+    """One number that changes whenever the contents of df change."""
+    if df is None or df.empty:
+        return 0
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return int(pd.util.hash_array(row_hashes).sum())
+
+
+def _row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """uint64 hash per row over the columns the enrichment chain reads (prepared frame)."""
+    return pd.util.hash_pandas_object(df[INPUT_COLS], index=False).to_numpy()
+
+
+def _context_key(side: dict) -> tuple:
+    return (
+        gas_penalty(side["gas_gwei"]),
+        side["vol_table"]["version"] if side.get("vol_table") else None,
+        _frame_fingerprint(side["audit_df"]),
+        _frame_fingerprint(side["trend_baseline"]),
+        _frame_fingerprint(side["apy_backtest"].reset_index()),
+    )
+
+
+class IncrementalEnricher:
+    """
+    Keeps the last enriched table plus one input hash per pool.
+    run() returns the same table a full enrich() would, but only pays for
+    the rows that changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._context = None
+        self._hashes = None   # pd.Series of uint64, index = pool id
+        self._result = None   # last enriched DataFrame
+        self.last_changed = None
+
+    def run(self, df_raw: pd.DataFrame, side: dict = None) -> pd.DataFrame:
+        if side is None:
+            side = fetch_side_inputs()
+        with self._lock:
+            return self._run(df_raw, side).copy(deep=False)
+
+    def _run(self, df_raw, side):
+        # Snapshot is always written for the whole universe, once, and the
+        # trend baseline is read once and shared by every enrich() call.
+        side = with_trend_baseline(df_raw, side)
+        context = _context_key(side)
+
+        # We need a clean unique key to splice on; otherwise do it the slow way.
+        keyed = (
+            "pool" in df_raw.columns
+            and not df_raw["pool"].isna().any()
+            and df_raw["pool"].is_unique
+        )
+        if not keyed or df_raw.empty or self._result is None or context != self._context:
+            return self._full(df_raw, side, context, keyed)
+
+        # Today's raw columns, prepared once; derived columns get spliced onto it.
+        df = prepare_input(df_raw)
+        pools = pd.Index(df["pool"])
+        hashes = _row_hashes(df)
+
+        pos = self._hashes.index.get_indexer(pools)
+        known = pos >= 0
+        changed = ~known
+        changed[known] = self._hashes.to_numpy()[pos[known]] != hashes[known]
+
+        # Derived columns: cached rows for unchanged pools, fresh for the rest,
+        # each labelled with its row position in today's table.
+        parts = []
+        if not changed.all():
+            cached = self._result[DERIVED_COLS].iloc[pos[~changed]]
+            parts.append(cached.set_axis(np.flatnonzero(~changed)))
+        if changed.any():
+            fresh = enrich(df_raw[changed], side, save_snapshot=False)
+            parts.append(fresh[DERIVED_COLS].set_axis(np.flatnonzero(changed)))
+        derived = pd.concat(parts).sort_index().set_axis(df.index)
+        for col in DERIVED_COLS:
+            df[col] = derived[col]
+        for stage in STAGES:
+            if stage.name in RERUN_STAGES:
+                stage.run(df, side)  # overwrites its columns in place, order kept
+
+        self._hashes = pd.Series(hashes, index=pools)
+        self._result = df
+        self.last_changed = int(changed.sum())
+        print(f"[incremental] re-enriched {self.last_changed}/{len(df)} pools")
+        return df
+
+    def _full(self, df_raw, side, context, keyed):
+        out = enrich(df_raw, side, save_snapshot=False)
+        if keyed:
+            self._context = context
+            self._hashes = pd.Series(_row_hashes(out), index=pd.Index(out["pool"]))
+            self._result = out
+        else:
+            self.reset()
+        self.last_changed = len(df_raw)
+        return out
+
+
+# One per process: Streamlit keeps imported modules alive across reruns.
+_default = IncrementalEnricher()
+
+
+def enrich_incremental(df_raw: pd.DataFrame, side: dict = None) -> pd.DataFrame:
+    """Drop-in for pipeline.enrich() that reuses the previous refresh."""
+    return _default.run(df_raw, side)
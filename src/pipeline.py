@@ -0,0 +1,217 @@
+# pipeline.py
+# The enrichment chain, declared once:
+#   basic -> il -> uniswap -> trend -> backtest -> risk
+# Each Stage says which columns it reads and which it writes. The pipeline
+# makes ONE owned copy of the raw table at the boundary (normalized to
+# RAW_SCHEMA), and every stage adds its columns to that frame in place.
+# The contract is checked when this module is imported, so a stage reading
+# a column nobody writes fails fast instead of at render time.
+#
+# Side inputs (gas, token volatility, Uniswap, audit table, 7d baseline,
+# APY backtest) are fetched once per
+# refresh and handed to every stage, so the chain can also be run on slices
+# of the table (incremental.py, parallel.py).
+
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .backtest import BACKTEST_COLS, add_backtest_columns, load_apy_backtest
+from .enrich_metrics import add_basic_columns, add_uniswap_columns, fetch_uniswap_table
+from .fetch_audit import get_external_audit_table
+from .fetch_gas import get_eth_gas_gwei
+from .il_sim import add_il_columns, load_vol_table
+from .risk_flags import apply_risk_flags
+from .snapshots import compute_tvl_trend_7d, load_trend_baseline, save_today_snapshot
+
+# Raw DeFiLlama columns the stages read, and their dtypes after the boundary.
+# Missing ones are added (NaN / None); numbers are coerced to float64.
+RAW_SCHEMA = {
+    "pool": object,
+    "project": object,
+    "chain": object,
+    "symbol": object,
+    "tvlUsd": "float64",
+    "apyBase": "float64",
+    "apyReward": "float64",
+}
+INPUT_COLS = list(RAW_SCHEMA)
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    reads: tuple
+    writes: tuple
+    run: Callable  # run(df, side) -> None, adds `writes` to df in place
+
+
+def _trend(df, side):
+    # best-effort: history problems shouldn't take the table down
+    try:
+        compute_tvl_trend_7d(df, baseline=side.get("trend_baseline"))
+    except Exception as e:
+        print(f"[trend] compute_tvl_trend_7d failed: {e}")
+        df["tvlUsd_7d_ago"] = np.nan
+        df["tvl_trend_7d"] = np.nan
+
+
+STAGES = (
+    Stage(
+        "basic",
+        reads=("chain", "project", "symbol", "apyBase", "apyReward"),
+        writes=("fee_apy", "reward_apy", "total_apy", "gas_context", "net_yield_after_gas", "il_risk", "pool_name"),
+        run=lambda df, side: add_basic_columns(df, gas_gwei=side["gas_gwei"]),
+    ),
+    Stage(
+        "il",
+        reads=("symbol",),
+        writes=("il_expected_pct", "il_tail_pct"),
+        run=lambda df, side: add_il_columns(df, vol_table=side.get("vol_table")),
+    ),
+    Stage(
+        "uniswap",
+        reads=("symbol",),
+        writes=("volume_24h_usd", "tvl_uniswap_usd", "vol_to_tvl", "feeTier"),
+        run=lambda df, side: add_uniswap_columns(df, df_uni=side["df_uni"]),
+    ),
+    Stage(
+        "trend",
+        reads=("project", "chain", "symbol", "tvlUsd"),
+        writes=("tvlUsd_7d_ago", "tvl_trend_7d"),
+        run=_trend,
+    ),
+    Stage(
+        "backtest",
+        reads=("pool",),
+        writes=tuple(BACKTEST_COLS),
+        run=lambda df, side: add_backtest_columns(df, metrics=side.get("apy_backtest")),
+    ),
+    Stage(
+        "risk",
+        reads=("project", "chain", "tvlUsd", "il_risk", "fee_apy", "reward_apy"),
+        writes=("external_audit_score", "exploited_recently", "audit_status", "red_flag"),
+        run=lambda df, side: apply_risk_flags(df, audit_df=side["audit_df"]),
+    ),
+)
+
+# Every column the stages add, in the order they add them.
+DERIVED_COLS = [col for stage in STAGES for col in stage.writes]
+OUTPUT_COLS = INPUT_COLS + DERIVED_COLS
+
+
+def _check_contract(stages):
+    available = set(INPUT_COLS)
+    for stage in stages:
+        missing = set(stage.reads) - available
+        if missing:
+            raise RuntimeError(f"stage {stage.name!r} reads {sorted(missing)} which no earlier stage writes")
+        available |= set(stage.writes)
+
+
+_check_contract(STAGES)
+
+
+def prepare_input(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    The boundary: one owned copy of df_raw with every RAW_SCHEMA column
+    present and typed. Everything downstream mutates this frame.
+    """
+    df = df_raw.copy() if df_raw is not None else pd.DataFrame()
+    for col, dtype in RAW_SCHEMA.items():
+        if col not in df.columns:
+            df[col] = np.nan if dtype == "float64" else None
+        elif dtype == "float64" and df[col].dtype != "float64":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    return df
+
+
+def run_stages(df: pd.DataFrame, side: dict) -> pd.DataFrame:
+    """Run every stage on an owned, prepared frame (in place) and return it."""
+    for stage in STAGES:
+        stage.run(df, side)
+    return df
+
+
+def validate_output(df: pd.DataFrame) -> pd.DataFrame:
+    """Every declared column is there. A miss is a stage bug, so fail loudly."""
+    missing = [col for col in OUTPUT_COLS if col not in df.columns]
+    if missing:
+        raise RuntimeError(f"pipeline output is missing declared columns: {missing}")
+    return df
+
+
+def fetch_side_inputs() -> dict:
+    """
+    Everything the stages need besides the pool table itself:
+    - gas_gwei  (float or None)
+    - vol_table (token volatility for the IL simulation, see il_sim.py)
+    - df_uni    (Uniswap pools, maybe empty)
+    - audit_df  (external audit table, maybe empty)
+    Callers may add "trend_baseline" and "apy_backtest" (see
+    with_trend_baseline) once today's snapshot is written; otherwise the
+    trend / backtest stages load them themselves.
+    """
+    return {
+        "gas_gwei": get_eth_gas_gwei(),
+        "vol_table": load_vol_table(),
+        "df_uni": fetch_uniswap_table(),
+        "audit_df": get_external_audit_table(),
+    }
+
+
+def with_trend_baseline(df_raw: pd.DataFrame, side: dict, save_snapshot: bool = True) -> dict:
+    """
+    Write today's snapshot for the whole universe (best-effort), then load the
+    7d TVL baseline and the APY backtest once so every slice of the table
+    sees the same history.
+    Returns a copy of side with "trend_baseline" and "apy_backtest" set.
+    """
+    if save_snapshot:
+        try:
+            save_today_snapshot(df_raw)
+        except Exception as e:
+            print(f"[pipeline] snapshot save failed: {e}")
+    try:
+        baseline = load_trend_baseline(days=7)
+    except Exception as e:
+        print(f"[pipeline] trend baseline load failed: {e}")
+        baseline = pd.DataFrame()
+    try:
+        backtest = load_apy_backtest()
+    except Exception as e:
+        print(f"[pipeline] APY backtest failed: {e}")
+        backtest = pd.DataFrame(columns=BACKTEST_COLS)
+    return {**side, "trend_baseline": baseline, "apy_backtest": backtest}
+
+
+def enrich_serial(df_raw: pd.DataFrame, side: dict, save_snapshot: bool = True) -> pd.DataFrame:
+    """Run the chain on one core. This is the reference output."""
+    df = prepare_input(df_raw)
+    if save_snapshot or "trend_baseline" not in side:
+        side = with_trend_baseline(df, side, save_snapshot=save_snapshot)
+    return validate_output(run_stages(df, side))
+
+
+def enrich(df_raw: pd.DataFrame, side: dict = None, save_snapshot: bool = True) -> pd.DataFrame:
+    """
+    Run the full enrichment chain on df_raw and return the scored table
+    (OUTPUT_COLS plus whatever other raw columns df_raw had).
+    save_snapshot=False skips writing today's TVL snapshot (use it when
+    df_raw is only part of the universe).
+    Big tables go through the process pool in parallel.py when
+    config.PARALLEL_WORKERS > 1; the output is identical either way.
+    """
+    if side is None:
+        side = fetch_side_inputs()
+
+    if config.PARALLEL_WORKERS > 1 and len(df_raw) >= config.PARALLEL_MIN_ROWS:
+        from .parallel import enrich_parallel
+        if save_snapshot or "trend_baseline" not in side:
+            side = with_trend_baseline(df_raw, side, save_snapshot=save_snapshot)
+        return enrich_parallel(df_raw, side, workers=config.PARALLEL_WORKERS)
+
+    return enrich_serial(df_raw, side, save_snapshot=save_snapshot)
@@ -0,0 +1,191 @@
+# publish.py
+# Write the scored table where other services can read it without scraping
+# the Streamlit page (see reader.py for the read side).
+#
+# Every publish writes one version:
+#   data/published/screen-<version>.arrow    Arrow IPC file, uncompressed so
+#                                            readers can memory-map it
+#   data/published/screen-<version>.parquet  same table for non-Arrow tools
+#   data/published/latest.json               manifest pointing at the newest
+#                                            (+ when it was last refreshed and
+#                                            the gas reading at that time)
+# Files are written under a temp name and os.replace()d into place, and the
+# manifest is swapped last, so a reader never sees a half-written table.
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .backtest import BACKTEST_COLS
+from .reader import MANIFEST_NAME, PUBLISH_DIR, latest_manifest
+
+KEEP_VERSIONS = 5
+
+# Columns that are numbers but can come out of the pipeline as object
+# (None placeholders, "—" for a missing trend). Published as float64.
+NUMERIC_COLS = [
+    "tvlUsd",
+    "apyBase",
+    "apyReward",
+    "fee_apy",
+    "reward_apy",
+    "total_apy",
+    "net_yield_after_gas",
+    "tvl_trend_7d",
+    "tvlUsd_7d_ago",
+    "volume_24h_usd",
+    "tvl_uniswap_usd",
+    "vol_to_tvl",
+    "feeTier",
+    "il_expected_pct",
+    "il_tail_pct",
+] + [col for col in BACKTEST_COLS if col != "apy_sustainable"]
+
+# Text columns readers filter / join on. Published as string even when every
+# value is missing (an empty table would otherwise type them as null).
+STRING_COLS = [
+    "pool",
+    "project",
+    "chain",
+    "symbol",
+    "pool_name",
+    "gas_context",
+    "il_risk",
+    "audit_status",
+    "red_flag",
+    "external_audit_score",  # 0-100 or text, depending on the audit source
+]
+
+# True / False / None columns, published as bool (nulls kept).
+BOOL_COLS = ["exploited_recently", "apy_sustainable"]
+
+
+def _as_strings(values: pd.Series) -> pa.Array:
+    return pa.array(values.map(lambda v: None if v is None or v is pd.NA or v != v else str(v)), type=pa.string())
+
+
+def to_arrow(df: pd.DataFrame) -> pa.Table:
+    """
+    pandas -> Arrow with types readers can rely on: NUMERIC_COLS as float64,
+    BOOL_COLS as bool, STRING_COLS and anything Arrow can't type (mixed
+    objects) as string. Those types hold even for an empty table.
+    """
+    arrays = []
+    for col in df.columns:
+        values = df[col]
+        if col in STRING_COLS:
+            arrays.append(_as_strings(values))
+            continue
+        if col in BOOL_COLS:
+            arrays.append(pa.array(values.astype(object).where(values.notna(), None), type=pa.bool_()))
+            continue
+        if col in NUMERIC_COLS:
+            values = pd.to_numeric(values, errors="coerce").astype("float64")
+        try:
+            arr = pa.array(values, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arr = _as_strings(values)
+        arrays.append(arr)
+    return pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+
+
+def _serialize(table: pa.Table) -> pa.Buffer:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _atomic_write(path: str, write_fn):
+    """
+    write_fn(tmp_path) next to path, then rename over it. The temp name is
+    unique per call, so two writers (a refresh in each of two processes)
+    can't clobber each other's half-written file; the last rename wins.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        os.chmod(tmp_path, 0o644)  # mkstemp makes it owner-only; other services read these
+        write_fn(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def publish_table(df: pd.DataFrame, gas_gwei=None, publish_dir: str = PUBLISH_DIR) -> dict:
+    """
+    Publish df as a new version and return its manifest. If df is identical
+    to what's already published, only the manifest's refreshed_utc and
+    gas_gwei are updated.
+    """
+    table = to_arrow(df)
+    payload = _serialize(table)
+    fingerprint = hashlib.blake2b(memoryview(payload), digest_size=16).hexdigest()
+
+    def write_manifest(manifest):
+        def write(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+        _atomic_write(os.path.join(publish_dir, MANIFEST_NAME), write)
+
+    now = datetime.utcnow()
+    current = latest_manifest(publish_dir)
+    if current and current.get("fingerprint") == fingerprint:
+        # Same table: just record that we checked (and the latest gas reading).
+        current = {**current, "refreshed_utc": now.isoformat() + "Z", "gas_gwei": gas_gwei}
+        write_manifest(current)
+        return current
+
+    os.makedirs(publish_dir, exist_ok=True)
+    version = now.strftime("%Y%m%dT%H%M%S%fZ")
+    arrow_name = f"screen-{version}.arrow"
+    parquet_name = f"screen-{version}.parquet"
+
+    def write_arrow(path):
+        with open(path, "wb") as f:
+            f.write(memoryview(payload))
+
+    _atomic_write(os.path.join(publish_dir, arrow_name), write_arrow)
+    _atomic_write(os.path.join(publish_dir, parquet_name), lambda path: pq.write_table(table, path))
+
+    manifest = {
+        "version": version,
+        "created_utc": now.isoformat() + "Z",
+        "refreshed_utc": now.isoformat() + "Z",
+        "rows": table.num_rows,
+        "arrow": arrow_name,
+        "parquet": parquet_name,
+        "fingerprint": fingerprint,
+        "gas_gwei": gas_gwei,
+    }
+    write_manifest(manifest)
+    _prune(publish_dir)
+    return manifest
+
+
+def _prune(publish_dir: str):
+    """
+    Keep the newest KEEP_VERSIONS versions. Readers that still have an older
+    file mapped keep working: unlinking doesn't invalidate an open mapping.
+    """
+    versions = sorted(
+        name[len("screen-"):-len(".arrow")]
+        for name in os.listdir(publish_dir)
+        if name.startswith("screen-") and name.endswith(".arrow")
+    )
+    for version in versions[:-KEEP_VERSIONS]:
+        for ext in (".arrow", ".parquet"):
+            try:
+                os.remove(os.path.join(publish_dir, f"screen-{version}{ext}"))
+            except OSError:
+                pass
@@ -0,0 +1,67 @@
+# reader.py
+# Read API for the table publish.py writes. Meant to be imported by other
+# services, so it only needs pyarrow (pandas only if you ask for a frame).
+#
+#   from src.reader import read_latest
+#   df = read_latest(chains=["Arbitrum", "Base"], min_tvl=1_000_000)
+#
+# The newest Arrow file is memory-mapped; filters run on the mapped buffers,
+# so only the rows you keep are ever copied.
+
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+PUBLISH_DIR = "data/published"
+MANIFEST_NAME = "latest.json"
+
+
+def latest_manifest(publish_dir: str = PUBLISH_DIR):
+    """latest.json as a dict (version, created_utc, rows, ...), or None."""
+    try:
+        with open(os.path.join(publish_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def open_latest(publish_dir: str = PUBLISH_DIR):
+    """
+    Memory-map the newest published version. Returns (table, manifest), or
+    (None, None) if nothing has been published yet.
+    """
+    manifest = latest_manifest(publish_dir)
+    if manifest is None:
+        return None, None
+    source = pa.memory_map(os.path.join(publish_dir, manifest["arrow"]), "r")
+    table = pa.ipc.open_file(source).read_all()
+    return table, manifest
+
+
+def filter_table(table: pa.Table, chains=None, min_tvl=None, columns=None) -> pa.Table:
+    """Keep rows on `chains` with tvlUsd >= min_tvl, then select `columns`."""
+    mask = None
+    if chains is not None:
+        # cast: tables published before chain was always string may type it null
+        mask = pc.is_in(table["chain"].cast(pa.string()), value_set=pa.array(list(chains), type=pa.string()))
+    if min_tvl is not None:
+        tvl_ok = pc.greater_equal(table["tvlUsd"], float(min_tvl))
+        mask = tvl_ok if mask is None else pc.and_(mask, tvl_ok)
+    if mask is not None:
+        table = table.filter(pc.fill_null(mask, False))
+    if columns is not None:
+        table = table.select(list(columns))
+    return table
+
+
+def read_latest(chains=None, min_tvl=None, columns=None, publish_dir: str = PUBLISH_DIR):
+    """
+    Latest published table as a pandas DataFrame, filtered by chain / TVL.
+    Returns None if nothing has been published yet.
+    """
+    table, _ = open_latest(publish_dir)
+    if table is None:
+        return None
+    return filter_table(table, chains=chains, min_tvl=min_tvl, columns=columns).to_pandas()
@@ -0,0 +1,95 @@
+# refresh.py
+# Fetch + enrich + publish, off the Streamlit script thread.
+#
+# app.py paints whatever was last published straight away (through
+# data_service.py, which calls start_refresh() when that is stale). One
+# refresh runs per process at a time no matter how many sessions ask for
+# it; when it finishes the new version is in data/published and the next
+# rerun picks it up.
+
+import threading
+import time
+
+from . import config
+from .change_feed import record_changes
+from .fetch_llama import get_yield_data
+from .incremental import enrich_incremental
+from .pipeline import enrich, fetch_side_inputs
+from .publish import publish_table
+
+_lock = threading.Lock()
+_thread = None
+_started_at = None
+_finished_at = None
+last_error = None
+
+
+def run_refresh() -> dict:
+    """
+    Fetch, enrich, diff and publish once, on the calling thread. Returns the
+    manifest. Raises (publishing nothing) if the fetch came back empty.
+    """
+    # 1. Fetch raw data + everything the stages share. No pools means
+    #    DeFiLlama failed with nothing cached: keep the published version
+    #    (and today's snapshot) instead of replacing them with an empty table.
+    df_raw = get_yield_data()
+    if df_raw.empty:
+        raise RuntimeError("DeFiLlama returned no pools (down, nothing cached); keeping the last published table")
+    side = fetch_side_inputs()
+    gas_gwei = side["gas_gwei"]
+
+    # 2-4. Derive metrics, TVL trend + snapshot, audit_status + red_flag.
+    #      Incremental mode only re-enriches pools whose inputs changed.
+    #      Every column in pipeline.OUTPUT_COLS is guaranteed by the stage contract.
+    if config.INCREMENTAL_ENRICHMENT:
+        df_scored = enrich_incremental(df_raw, side)
+    else:
+        df_scored = enrich(df_raw, side)
+
+    # 5. Diff against the previous refresh and append to data/changes/changes.jsonl
+    record_changes(df_scored)
+
+    # 6. Publish as Arrow/Parquet (app.py and other services read it back)
+    return publish_table(df_scored, gas_gwei=gas_gwei)
+
+
+def _worker():
+    global _thread, _finished_at, last_error
+    try:
+        run_refresh()
+        last_error = None
+    except Exception as e:
+        print(f"[refresh] failed: {e}")
+        last_error = str(e)
+    finally:
+        with _lock:
+            _thread = None
+            _finished_at = time.time()
+
+
+def start_refresh():
+    """Kick off a background refresh unless one is already running."""
+    global _thread, _started_at
+    with _lock:
+        if _thread is None:
+            _started_at = time.time()
+            _thread = threading.Thread(target=_worker, name="pool-refresh", daemon=True)
+            _thread.start()
+
+
+def is_refreshing() -> bool:
+    return _thread is not None
+
+
+def seconds_refreshing() -> float:
+    """How long the current refresh has been running (0 if none)."""
+    if _thread is None or _started_at is None:
+        return 0.0
+    return time.time() - _started_at
+
+
+def seconds_since_last_refresh() -> float:
+    """Seconds since the last refresh in this process finished (inf if none has)."""
+    if _finished_at is None:
+        return float("inf")
+    return time.time() - _finished_at
@@ -0,0 +1,284 @@
+# resilience.py
+# Per-source guard for upstream calls (DeFiLlama, Uniswap subgraph, gas).
+#
+# Each source gets:
+# - a latency budget: a hard deadline on the whole call. The fetch runs on a
+#   worker thread and we stop waiting when the budget is up, so a server
+#   that trickles its body can't hold a refresh past it (requests' own
+#   timeout only bounds each socket read). The abandoned worker finishes or
+#   times out on its own; the breaker stops us starting more of them.
+# - a circuit breaker over the last few calls: once the failure rate is too
+#   high it opens and we stop calling for a cooldown, then let one probe
+#   through (half-open); success closes it, failure re-opens it
+# - the last good payload per request (memory + data/cache/<source>.json, or
+#   <source>-<key hash>.json for keyed requests), served whenever the
+#   breaker is open or the call fails
+# so a dead upstream costs one timeout, not one per refresh.
+# Identical calls that overlap in time (same source, same key) are coalesced
+# into one upstream request whose payload every caller shares.
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from . import config
+
+CACHE_DIR = "data/cache"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class SourceUnavailable(Exception):
+    """Upstream failed (or breaker is open) and there is no cached payload."""
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls: while do(key, fn) is running, other callers
+    with the same key wait for it and get the same result (or exception)
+    instead of running fn again. Nothing is cached once the call returns.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = Counter()   # key -> times fn actually ran
+        self.coalesced = Counter()  # key -> callers that rode along
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executed[key] += 1
+            else:
+                self.coalesced[key] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def counts(self) -> dict:
+        """key -> {"executed": times fn ran, "coalesced": callers that shared a run}."""
+        with self._lock:
+            return {k: {"executed": self.executed[k], "coalesced": self.coalesced[k]}
+                    for k in set(self.executed) | set(self.coalesced)}
+
+
+class CircuitBreaker:
+    def __init__(self, name, budget_seconds, window=None, failure_rate=None, min_calls=None, cooldown_seconds=None):
+        self.name = name
+        self.budget_seconds = budget_seconds
+        self.failure_rate = config.BREAKER_FAILURE_RATE if failure_rate is None else failure_rate
+        self.min_calls = config.BREAKER_MIN_CALLS if min_calls is None else min_calls
+        self.cooldown_seconds = config.BREAKER_COOLDOWN_SECONDS if cooldown_seconds is None else cooldown_seconds
+        self._outcomes = deque(maxlen=config.BREAKER_WINDOW if window is None else window)
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.opened_at = None
+        self._probing = False
+        self.last_error = None
+        self.last_latency = None
+        self.last_success_at = None
+        self.serving_cache_since = None
+
+    def allow(self) -> bool:
+        """May we call upstream right now? (Claims the probe slot when half-open.)"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.time() - self.opened_at < self.cooldown_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self, latency):
+        with self._lock:
+            self.last_latency = latency
+            self.last_success_at = time.time()
+            self.serving_cache_since = None
+            if self.state == HALF_OPEN:
+                self._outcomes.clear()
+            self.state = CLOSED
+            self._probing = False
+            self._outcomes.append(True)
+
+    def record_failure(self, error, latency=None):
+        with self._lock:
+            self.last_error = str(error)
+            self.last_latency = latency
+            self._outcomes.append(False)
+            if self.state == HALF_OPEN:
+                self._trip()
+                return
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._trip()
+
+    def _trip(self):
+        self.state = OPEN
+        self.opened_at = time.time()
+        self._probing = False
+
+    def status(self) -> dict:
+        """Plain dict for the UI."""
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, self.cooldown_seconds - (time.time() - self.opened_at))
+            return {
+                "source": self.name,
+                "state": self.state,
+                "budget_seconds": self.budget_seconds,
+                "retry_in_seconds": retry_in,
+                "last_latency": self.last_latency,
+                "last_error": self.last_error,
+                "last_success_at": self.last_success_at,
+                "serving_cache_since": self.serving_cache_since,
+            }
+
+
+_breakers = {}
+_last_good = {}
+_registry_lock = threading.Lock()
+_flight = SingleFlight()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _registry_lock:
+        if name not in _breakers:
+            budget = config.SOURCE_LATENCY_BUDGETS.get(name, config.DEFAULT_LATENCY_BUDGET)
+            _breakers[name] = CircuitBreaker(name, budget)
+        return _breakers[name]
+
+
+def breaker_statuses() -> list:
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return [b.status() for b in breakers]
+
+
+def _cache_path(name, key=None):
+    if key is None:
+        return os.path.join(CACHE_DIR, f"{name}.json")
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+    return os.path.join(CACHE_DIR, f"{name}-{digest}.json")
+
+
+def _save_last_good(name, key, payload):
+    _last_good[(name, key)] = payload
+    tmp_path = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # unique temp name: concurrent writers (other processes) can't clobber it
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, prefix=f"{name}.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, _cache_path(name, key))
+    except (OSError, TypeError, ValueError) as e:
+        print(f"[resilience] could not cache {name} payload: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _load_last_good(name, key):
+    if (name, key) in _last_good:
+        return _last_good[(name, key)]
+    try:
+        with open(_cache_path(name, key), encoding="utf-8") as f:
+            _last_good[(name, key)] = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return _last_good[(name, key)]
+
+
+def guarded_fetch(name: str, fetch_fn, key=None):
+    """
+    Call fetch_fn(timeout_seconds) for source `name` behind its breaker and
+    return its (JSON-able) payload. Falls back to the last good payload when
+    the breaker is open or the call fails / blows its latency budget.
+    Raises SourceUnavailable if there is nothing to fall back to.
+    Concurrent calls with the same (name, key) share one fetch, so treat the
+    payload as read-only. key tells different requests to one source apart
+    (e.g. the query text): each key has its own last good payload, while the
+    breaker and latency budget are per source.
+    """
+    return _flight.do((name, key), lambda: _guarded_fetch(name, fetch_fn, key))
+
+
+def fetch_counts() -> dict:
+    """(name, key) -> {"executed": upstream attempts, "coalesced": callers that shared one}."""
+    return _flight.counts()
+
+
+def _call_with_deadline(name, fetch_fn, budget):
+    """
+    fetch_fn(budget) on a daemon worker thread; its result if it finishes
+    within budget seconds, else TimeoutError. The worker isn't killed (Python
+    can't), we just stop waiting for it and drop whatever it returns.
+    """
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fetch_fn(budget))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=f"fetch-{name}", daemon=True).start()
+    try:
+        return future.result(timeout=budget)
+    except FutureTimeout:
+        raise TimeoutError(f"no complete response within the {budget:.1f}s latency budget") from None
+
+
+def _guarded_fetch(name, fetch_fn, key=None):
+    breaker = get_breaker(name)
+
+    if breaker.allow():
+        started = time.monotonic()
+        try:
+            payload = _call_with_deadline(name, fetch_fn, breaker.budget_seconds)
+        except Exception as e:
+            breaker.record_failure(e, time.monotonic() - started)
+            print(f"[resilience] {name} failed: {e}")
+        else:
+            _save_last_good(name, key, payload)
+            breaker.record_success(time.monotonic() - started)
+            return payload
+
+    cached = _load_last_good(name, key)
+    if cached is None:
+        raise SourceUnavailable(f"{name}: {breaker.last_error or 'circuit open'}; no cached payload")
+    if breaker.serving_cache_since is None:
+        breaker.serving_cache_since = time.time()
+    return cached
+
+
+def reset():
+    """Forget all breaker state and in-memory payloads (the disk cache stays)."""
+    with _registry_lock:
+        _breakers.clear()
+        _last_good.clear()
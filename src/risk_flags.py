@@ -7,24 +7,30 @@ import pandas as pd
 from . import config
 from .fetch_audit import get_external_audit_table
 
-def apply_risk_flags(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-
+def apply_risk_flags(df: pd.DataFrame, audit_df=None) -> pd.DataFrame:
+    """
+    Add audit_status and red_flag (plus the external audit columns) to df in
+    place and return it. audit_df can be passed in when the caller already
+    fetched the external audit table, otherwise we fetch it here.
+    """
     # Bring in external audit/exploit info if available
-    audit_df = get_external_audit_table()
+    if audit_df is None:
+        audit_df = get_external_audit_table()
     if not audit_df.empty:
-        df = df.merge(
-            audit_df,
-            how="left",
-            left_on="project",
-            right_on="project",
-            suffixes=("", "_audit")
-        )
+        lookup = audit_df.drop_duplicates("project").set_index("project")
+        scores = df["project"].map(lookup["external_audit_score"]).astype(object)
+        df["external_audit_score"] = scores.where(scores.notna(), None)
+        df["exploited_recently"] = df["project"].map(lookup["exploited_recently"]).fillna(False).astype(bool)
     else:
         # ensure columns exist
         df["external_audit_score"] = None
         df["exploited_recently"] = False
 
+    if df.empty:
+        df["audit_status"] = pd.Series(dtype=object)
+        df["red_flag"] = pd.Series(dtype=object)
+        return df
+
     # audit_status from config.PROTOCOL_SAFETY or fallback to external info
     def get_audit_status(row):
         proj = row.get("project", "")
@@ -0,0 +1,76 @@
+# scoring.py
+# Composite, risk-adjusted score with user-chosen weights.
+# The expensive part - turning the scored table into a normalized feature
+# matrix (one row per pool, one column per SCORE_FEATURES entry, all in
+# 0..1 where higher is better) - happens once per data version. Moving a
+# weight slider is then one matrix-vector product plus a top-K selection.
+
+import numpy as np
+import pandas as pd
+
+# Feature key -> sidebar label. Order = column order of the feature matrix.
+SCORE_FEATURES = {
+    "fee_share": "Fee share of APY",
+    "vol_to_tvl": "Volume / TVL",
+    "tvl": "TVL",
+    "tvl_trend": "TVL trend (7d)",
+    "il_tier": "Low IL risk",
+    "no_red_flag": "No ⚠ red flag",
+}
+
+IL_TIER_SCORES = {"Low": 1.0, "Medium": 0.5, "High": 0.0}
+
+# Value for pools where a feature is unknown (no Uniswap match, no 7d
+# history, ...): neither rewarded nor punished.
+NEUTRAL = 0.5
+
+
+def _pct_rank(values: pd.Series) -> np.ndarray:
+    """Percentile rank in 0..1 (ties share a rank), NaN -> NEUTRAL. Robust to heavy tails like TVL."""
+    ranks = pd.to_numeric(values, errors="coerce").rank(pct=True, method="average")
+    return ranks.fillna(NEUTRAL).to_numpy(dtype=float)
+
+
+def build_feature_matrix(df: pd.DataFrame) -> np.ndarray:
+    """
+    (len(df), len(SCORE_FEATURES)) float64 matrix, columns in SCORE_FEATURES
+    order, every value in 0..1. Build it once per data version and cache it.
+    """
+    n = len(df)
+    if n == 0:
+        return np.empty((0, len(SCORE_FEATURES)))
+
+    fee = pd.to_numeric(df["fee_apy"], errors="coerce").to_numpy(dtype=float)
+    total = pd.to_numeric(df["total_apy"], errors="coerce").to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fee_share = np.clip(np.where(total > 0, fee / total, np.nan), 0.0, 1.0)
+
+    columns = {
+        "fee_share": np.where(np.isnan(fee_share), NEUTRAL, fee_share),
+        "vol_to_tvl": _pct_rank(df["vol_to_tvl"]),
+        "tvl": _pct_rank(df["tvlUsd"]),
+        "tvl_trend": _pct_rank(df["tvl_trend_7d"]),
+        "il_tier": df["il_risk"].map(IL_TIER_SCORES).fillna(NEUTRAL).to_numpy(dtype=float),
+        "no_red_flag": (df["red_flag"].fillna("") == "").to_numpy(dtype=float),
+    }
+    return np.ascontiguousarray(np.column_stack([columns[key] for key in SCORE_FEATURES]))
+
+
+def weight_vector(weights: dict) -> np.ndarray:
+    """Sidebar weights (any scale) -> vector summing to 1, in SCORE_FEATURES order. All zero -> equal weights."""
+    w = np.array([max(float(weights.get(key, 0)), 0.0) for key in SCORE_FEATURES])
+    if w.sum() == 0:
+        w[:] = 1.0
+    return w / w.sum()
+
+
+def composite_scores(features: np.ndarray, weights: dict) -> np.ndarray:
+    """Score per pool, 0..100."""
+    return features @ weight_vector(weights) * 100.0
+
+
+def top_k_positions(scores: np.ndarray, positions: np.ndarray, k: int) -> np.ndarray:
+    """The (at most) k positions with the highest scores, best first."""
+    if len(positions) > k:
+        positions = positions[np.argpartition(-scores[positions], k - 1)[:k]]
+    return positions[np.argsort(-scores[positions], kind="stable")]
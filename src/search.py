@@ -0,0 +1,105 @@
+# search.py
+# Instant search over pool_name / symbol / project / chain.
+# Built once per data version: every row is split into lowercase tokens
+# ("WETH-USDC | uniswap-v3 | Arbitrum" -> weth, usdc, uniswap, v3, arbitrum)
+# and each distinct token keeps the sorted row positions it appears in.
+# A query term matches tokens that start with it (binary search over the
+# sorted vocabulary); a term with no prefix match falls back to tokens that
+# share enough character trigrams with it (typos: "wetj" -> weth).
+# Terms are ANDed. The result is row positions, so the app intersects it
+# with the sidebar filter mask instead of re-scanning strings.
+
+import re
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+SEARCH_COLS = ["pool_name", "symbol", "project", "chain"]
+TOKEN_RE = r"[0-9a-z]+"
+
+# Fuzzy fallback: Dice similarity of padded trigrams, and the shortest term
+# we try it for (shorter terms have too few trigrams to say anything).
+FUZZY_MIN_SIMILARITY = 0.5
+FUZZY_MIN_LEN = 3
+
+
+def _trigrams(token: str) -> set:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    index = SearchIndex(df_scored)
+    index.search("weth arb")  -> sorted row positions of df_scored
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        cols = [c for c in SEARCH_COLS if c in df.columns]
+        text = pd.Series("", index=range(self.n_rows), dtype=object)
+        for col in cols:
+            text = text + " " + df[col].fillna("").astype(str).to_numpy(dtype=object)
+
+        # (row, token) pairs, deduplicated, grouped by token
+        tokens = text.str.lower().str.findall(TOKEN_RE).explode().dropna()
+        rows = tokens.index.to_numpy(dtype=np.int64)
+        codes, vocab = pd.factorize(tokens.to_numpy(dtype=object), sort=True)
+        pairs = np.unique(codes.astype(np.int64) * max(self.n_rows, 1) + rows)
+        codes, rows = np.divmod(pairs, max(self.n_rows, 1))
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+
+        self.vocab = list(vocab)  # sorted, for prefix bisection
+        self.postings = np.split(rows, bounds) if len(rows) else []
+
+        # trigram -> vocab ids, for the fuzzy fallback
+        grams = {}
+        for token_id, token in enumerate(self.vocab):
+            for gram in _trigrams(token):
+                grams.setdefault(gram, []).append(token_id)
+        self.trigrams = {gram: np.array(ids, dtype=np.int64) for gram, ids in grams.items()}
+        self.token_gram_counts = np.array([len(_trigrams(token)) for token in self.vocab], dtype=np.int64)
+
+    def _prefix_ids(self, term: str) -> range:
+        lo = bisect_left(self.vocab, term)
+        hi = bisect_left(self.vocab, term + "\uffff", lo)
+        return range(lo, hi)
+
+    def _fuzzy_ids(self, term: str) -> np.ndarray:
+        if len(term) < FUZZY_MIN_LEN or not self.vocab:
+            return np.empty(0, dtype=np.int64)
+        grams = _trigrams(term)
+        hits = [self.trigrams[g] for g in grams if g in self.trigrams]
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        common = np.bincount(np.concatenate(hits), minlength=len(self.vocab))
+        dice = 2.0 * common / (len(grams) + self.token_gram_counts)
+        return np.flatnonzero(dice >= FUZZY_MIN_SIMILARITY)
+
+    def term_positions(self, term: str) -> np.ndarray:
+        """Sorted row positions matching one (lowercase) term."""
+        ids = self._prefix_ids(term)
+        if len(ids) == 0:
+            ids = self._fuzzy_ids(term)
+        if len(ids) == 0:
+            return np.empty(0, dtype=np.int64)
+        if len(ids) == 1:
+            return self.postings[ids[0]]
+        return np.unique(np.concatenate([self.postings[i] for i in ids]))
+
+    def search(self, query: str) -> np.ndarray:
+        """
+        Sorted row positions matching every term of query.
+        An empty query matches every row.
+        """
+        terms = re.findall(TOKEN_RE, (query or "").lower())
+        if not terms:
+            return np.arange(self.n_rows)
+        result = None
+        for term in sorted(set(terms), key=len, reverse=True):
+            hits = self.term_positions(term)
+            result = hits if result is None else np.intersect1d(result, hits, assume_unique=True)
+            if len(result) == 0:
+                break
+        return result
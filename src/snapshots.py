@@ -2,6 +2,7 @@
 # Handle writing and reading historical snapshots so we can compute TVL trend.
 
 import os
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
@@ -9,14 +10,15 @@ SNAPSHOT_DIR = "data/snapshots"
 
 def save_today_snapshot(df_current: pd.DataFrame):
     """
-    Save today's tvlUsd snapshot per pool into data/snapshots/YYYY-MM-DD.csv
-    We keep: date, pool_name-ish identifiers, and tvlUsd.
+    Save today's snapshot per pool into data/snapshots/YYYY-MM-DD.csv
+    We keep: date, pool id + pool_name-ish identifiers, tvlUsd, and the
+    advertised apyBase / apyReward (for the APY backtest in backtest.py).
     """
     os.makedirs(SNAPSHOT_DIR, exist_ok=True)
     today_str = datetime.utcnow().strftime("%Y-%m-%d")
 
-    cols_to_keep = ["project", "chain", "symbol", "tvlUsd"]
-    snap_df = df_current[cols_to_keep].copy()
+    cols_to_keep = ["pool", "project", "chain", "symbol", "tvlUsd", "apyBase", "apyReward"]
+    snap_df = df_current[[c for c in cols_to_keep if c in df_current.columns]].copy()
     snap_df.insert(0, "timestamp_utc", datetime.utcnow().isoformat() + "Z")
 
     out_path = os.path.join(SNAPSHOT_DIR, f"{today_str}.csv")
@@ -58,55 +60,58 @@ def load_recent_snapshots(days=7):
 
     return pd.concat(rows, ignore_index=True)
 
-def compute_tvl_trend_7d(df_current: pd.DataFrame) -> pd.DataFrame:
+def load_trend_baseline(days=7) -> pd.DataFrame:
     """
-    For each (project, chain, symbol) in df_current,
-    look up what tvlUsd was ~7 days ago in snapshots,
-    compute % change, and attach as 'tvl_trend_7d'.
-    If we can't compute it, use '—'.
+    Oldest tvlUsd per (project, chain, symbol) in the last `days` of snapshots,
+    as columns project, chain, symbol, tvlUsd_7d_ago. Empty if no history.
+    Today's snapshot is left out: it is rewritten on every refresh, so a pool
+    first seen today would be its own baseline and the baseline would move
+    with every refresh (which also forces incremental.py to recompute all).
     """
-    df_current = df_current.copy()
-    hist = load_recent_snapshots(days=7)
+    hist = load_recent_snapshots(days=days)
     if hist.empty:
-        df_current["tvl_trend_7d"] = "—"
-        return df_current
+        return pd.DataFrame()
+    today_str = datetime.utcnow().strftime("%Y-%m-%d")
+    hist = hist[hist["snapshot_date"] < today_str]
+    if hist.empty:
+        return pd.DataFrame()
 
     # pick oldest snapshot in the window for baseline
     # (not perfect but simple)
-    oldest_per_pool = (
+    return (
         hist.sort_values("snapshot_date")
             .groupby(["project", "chain", "symbol"], as_index=False)
             .first()[["project", "chain", "symbol", "tvlUsd"]]
             .rename(columns={"tvlUsd": "tvlUsd_7d_ago"})
     )
 
-    merged = df_current.merge(
-        oldest_per_pool,
-        on=["project", "chain", "symbol"],
-        how="left"
-    )
-
-    def pct_change(now, then):
-        try:
-            now_f = float(now)
-            then_f = float(then)
-            if then_f == 0:
-                return None
-            return ((now_f - then_f) / then_f) * 100.0
-        except (TypeError, ValueError):
-            return None
-
-    merged["tvl_trend_7d"] = merged.apply(
-        lambda r: pct_change(r.get("tvlUsd"), r.get("tvlUsd_7d_ago")),
-        axis=1
-    )
+def compute_tvl_trend_7d(df_current: pd.DataFrame, baseline: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    For each (project, chain, symbol) in df_current,
+    look up what tvlUsd was ~7 days ago in snapshots,
+    compute % change, and attach as 'tvl_trend_7d' (plus the baseline as
+    'tvlUsd_7d_ago'). Adds the columns in place and returns df_current.
+    If we can't compute it, the trend is NaN (shown as '—').
+    baseline (from load_trend_baseline) can be passed in to skip re-reading
+    the snapshot folder.
+    """
+    oldest_per_pool = load_trend_baseline(days=7) if baseline is None else baseline
+    if oldest_per_pool.empty or df_current.empty:
+        df_current["tvlUsd_7d_ago"] = np.nan
+        df_current["tvl_trend_7d"] = np.nan
+        return df_current
 
-    # If None, fallback "—"
-    def fmt(v):
-        if v is None:
-            return "—"
-        return v  # we'll pretty-format later in formatting.py
+    # Keyed lookup instead of a merge: no new frame, rows stay 1:1.
+    keys = ["project", "chain", "symbol"]
+    baseline_index = pd.MultiIndex.from_frame(oldest_per_pool[keys].astype(object))
+    pos = baseline_index.get_indexer(pd.MultiIndex.from_frame(df_current[keys].astype(object)))
+    then_values = pd.to_numeric(oldest_per_pool["tvlUsd_7d_ago"], errors="coerce").to_numpy(dtype=float)
+    then = np.where(pos >= 0, then_values[pos], np.nan)
+    now = pd.to_numeric(df_current["tvlUsd"], errors="coerce").to_numpy(dtype=float)
 
-    merged["tvl_trend_7d"] = merged["tvl_trend_7d"].apply(fmt)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        trend = np.where(then != 0, (now - then) / then * 100.0, np.nan)
 
-    return merged
+    df_current["tvlUsd_7d_ago"] = then
+    df_current["tvl_trend_7d"] = trend
+    return df_current
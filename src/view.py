@@ -0,0 +1,127 @@
+# view.py
+# Turn the scored table + sidebar choices into the leaderboard frame.
+# The scored table is shared by every rerun (and session) and is never
+# modified here: the filters become one boolean mask, and only the rows that
+# survive, and only the display columns, are copied - once - before sorting
+# and formatting.
+
+import numpy as np
+import pandas as pd
+
+from .formatting import format_for_display
+
+DISPLAY_COLS = [
+    "pool_name",            # <symbol> | <project> | <chain>
+    "tvlUsd",               # TVL
+    "volume_24h_usd",       # 24h volume (Uniswap v3 pools only right now)
+    "vol_to_tvl",           # capital efficiency
+    "fee_apy",              # fee APY
+    "reward_apy",           # incentive APY
+    "total_apy",            # fee + reward
+    "il_risk",              # Low / Medium / High
+    "il_expected_pct",      # simulated IL over config.IL_HORIZON_DAYS
+    "il_tail_pct",          # IL in the worst outcomes
+    "audit_status",         # includes exploit info where known
+    "gas_context",          # Cheap gas / High gas
+    "net_yield_after_gas",  # APY after gas penalty
+    "apy_realized_30d",     # what the pool actually paid over 30d (snapshot history)
+    "apy_persistence_30d",  # realized vs advertised 30d ago
+    "tvl_trend_7d",         # ▲ or ▼ once snapshot history accumulates
+    "red_flag",             # ⚠ marker
+]
+
+NICE_NAMES = {
+    "pool_name": "Pool",
+    "tvlUsd": "TVL ($)",
+    "volume_24h_usd": "Vol 24h ($)",
+    "vol_to_tvl": "Vol/TVL (24h)",
+    "fee_apy": "Fee APY (%)",
+    "reward_apy": "Reward APY (%)",
+    "total_apy": "Total APY (%)",
+    "il_risk": "IL Risk",
+    "il_expected_pct": "Exp. IL (%)",
+    "il_tail_pct": "Tail IL (%)",
+    "audit_status": "Audit / Exploit Status",
+    "gas_context": "Gas Context",
+    "net_yield_after_gas": "Net Yield After Gas (%)",
+    "apy_realized_30d": "Realized APY 30d (%)",
+    "apy_persistence_30d": "APY Held Up 30d (%)",
+    "tvl_trend_7d": "TVL Trend (7d)",
+    "red_flag": "Red Flag",
+}
+
+# Sidebar "Sort by" label -> numeric column we sort on (descending).
+# None = the weighted composite score from scoring.py.
+SORT_OPTIONS = {
+    "Net Yield After Gas (%)": "net_yield_after_gas",
+    "TVL ($)": "tvlUsd",
+    "Fee APY (%)": "fee_apy",
+    "Total APY (%)": "total_apy",
+    "Composite score": None,
+}
+
+# Sidebar "Max IL Risk allowed" label -> il_risk values kept (None = all)
+IL_CHOICES = {
+    "Low only": ["Low"],
+    "Low + Medium": ["Low", "Medium"],
+    "Show all": None,
+}
+
+
+def filter_mask(df: pd.DataFrame, chains=None, min_tvl=0, il_choice="Show all", hide_red_flag=False,
+                sustainable_only=False) -> np.ndarray:
+    """
+    One boolean per row of df: does it pass the sidebar filters?
+    chains=None (or every chain) means no chain filter.
+    sustainable_only keeps pools whose APY backtest says sustainable (not unknown).
+    """
+    mask = np.ones(len(df), dtype=bool)
+
+    # filter by chain
+    if chains is not None:
+        mask &= df["chain"].isin(chains).to_numpy()
+
+    # filter by min TVL
+    mask &= df["tvlUsd"].fillna(0).to_numpy() >= float(min_tvl)
+
+    # filter by IL risk
+    allowed = IL_CHOICES.get(il_choice)
+    if allowed is not None:
+        mask &= df["il_risk"].isin(allowed).to_numpy()
+
+    # filter by red flag
+    if hide_red_flag:
+        mask &= (df["red_flag"].fillna("") == "").to_numpy()
+
+    # filter by sustainable yield (backtest.py)
+    if sustainable_only:
+        mask &= df["apy_sustainable"].eq(True).to_numpy(dtype=bool)  # unknown (None) is dropped
+
+    return mask
+
+
+def sort_positions(df: pd.DataFrame, positions: np.ndarray, sort_col: str) -> np.ndarray:
+    """positions reordered by df[sort_col] descending, missing values last."""
+    keys = pd.to_numeric(df[sort_col], errors="coerce").to_numpy(dtype=float)[positions]
+    return positions[np.argsort(-keys, kind="stable")]
+
+
+def build_leaderboard(df: pd.DataFrame, positions: np.ndarray, scores: np.ndarray = None) -> pd.DataFrame:
+    """
+    Display frame for the given row positions (already in display order):
+    DISPLAY_COLS renamed to NICE_NAMES and formatted. This is the only copy
+    of table data a rerun makes.
+    scores (one per row of df, see scoring.py) adds a "Score" column after the pool.
+    """
+    cols = [df.columns.get_loc(c) for c in DISPLAY_COLS if c in df.columns]
+    out = df.iloc[positions, cols]
+    out.rename(columns=NICE_NAMES, inplace=True)
+    format_for_display(out)
+    if scores is not None:
+        out.insert(1, "Score", np.round(scores[positions], 1))
+
+    # Drop columns that are 100% empty/null after formatting
+    empty = [c for c in out.columns if out[c].isna().all()]
+    if empty:
+        out.drop(columns=empty, inplace=True)
+    return out